@@ -1,6 +1,13 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import Directory, VersionDirectory, DirectoryElement
+from .models import ApiKey, Directory, VersionDirectory, DirectoryElement
+from .services import version_elements
+from .snapshots import build_snapshot_later
 
 
 class VersionDirectoryInline(admin.TabularInline):
@@ -33,16 +40,20 @@ class DirectoryAdmin(admin.ModelAdmin):
     ]
 
     def get_queryset(self, request):
-        return Directory.objects.prefetch_related("versions")
+        """ Последняя версия справочника и её дата - подзапросами, без запросов на строку """
+        latest = VersionDirectory.objects.filter(directory=OuterRef("pk")).order_by("-created_date")
+        return super().get_queryset(request).annotate(
+            current_version=Subquery(latest.values("version")[:1]),
+            version_date=Subquery(latest.values("created_date")[:1]),
+        )
 
-    def get_current_version(self, obj: Directory) -> str:
-        return obj.versions.latest('created_date').version
+    @admin.display(description="Текущая версия", ordering="current_version")
+    def get_current_version(self, obj: Directory) -> str | None:
+        return obj.current_version
 
-    def get_version_date(self, obj: Directory) -> str:
-        return obj.versions.latest('created_date').created_date
-
-    get_current_version.short_description = "Текущая версия"
-    get_version_date.short_description = "Дата начала действия версии"
+    @admin.display(description="Дата начала действия версии", ordering="version_date")
+    def get_version_date(self, obj: Directory) -> str | None:
+        return obj.version_date
 
 
 @admin.register(VersionDirectory)
@@ -56,29 +67,101 @@ class VersionDirectoryAdmin(admin.ModelAdmin):
     fieldsets = [
         (None, {
             "description": "Основная информация о версии справочника",
-            "fields": ("directory", "version", "created_date"),
+            "fields": ("directory", "version", "created_date", "storage"),
         }),
     ]
-
-    def get_queryset(self, request):
-        return VersionDirectory.objects.prefetch_related("elements", "directory")
-
+    readonly_fields = ("storage", "get_elements")
+    list_select_related = ("directory",)
+
+    def get_fieldsets(self, request, obj=None):
+        if obj is None:
+            return self.fieldsets
+
+        (name, options), = self.fieldsets
+        return [(name, {**options, "fields": (*options["fields"], "get_elements")})]
+
+    def get_inline_instances(self, request, obj=None):
+        """
+        Большие версии (и версии с общим хранением) не редактируются встроенной
+        формой: она загружает все элементы на одну страницу. Вместо неё - ссылка
+        на постраничный список элементов версии
+        """
+        if obj and not self.elements_editable(obj):
+            return []
+        return super().get_inline_instances(request, obj)
+
+    @staticmethod
+    def elements_editable(obj: VersionDirectory) -> bool:
+        if not hasattr(obj, "_elements_editable"):
+            limit = settings.ADMIN_INLINE_MAX_ELEMENTS
+            obj._elements_editable = obj.storage == VersionDirectory.STORAGE_ROWS \
+                and obj.elements.all()[:limit + 1].count() <= limit
+        return obj._elements_editable
+
+    @admin.display(description="Элементы")
+    def get_elements(self, obj: VersionDirectory) -> str:
+        count = version_elements(obj.pk).count()
+
+        if obj.storage != VersionDirectory.STORAGE_ROWS:
+            return f"{count} (общее хранение)"
+
+        url = reverse("admin:service_api_directoryelement_changelist")
+        return format_html(
+            '<a href="{}?version_directory__id__exact={}">{}</a>', url, obj.pk, count,
+        )
+
+    def save_related(self, request, form, formsets, change):
+        """
+        После сохранения версии публикует её снимки. Сохранение меняет дату
+        изменения версии, а значит и имена снимков, поэтому они строятся при любом
+        сохранении - в фоновом потоке, не задерживая ответ админки
+        """
+        super().save_related(request, form, formsets, change)
+        version_id = form.instance.pk
+        transaction.on_commit(lambda: build_snapshot_later(version_id))
+
+    @admin.display(description="Код справочника", ordering="directory__code")
     def get_directory_code(self, obj: VersionDirectory) -> str:
         return obj.directory.code
 
+    @admin.display(description="Наименование справочника", ordering="directory__name")
     def get_directory_name(self, obj: VersionDirectory) -> str:
         return obj.directory.name
 
-    get_directory_code.short_description = "Код справочника"
-    get_directory_name.short_description = "Наименование справочника"
-
 
 @admin.register(DirectoryElement)
 class DirectoryElementAdmin(admin.ModelAdmin):
     """ Административная форма для элементов версий справочника """
+    list_display = "code", "value", "version_directory"
+    list_select_related = ("version_directory",)
+    raw_id_fields = ("version_directory",)
+    # Точное число элементов в таблице из сотен тысяч строк не считается
+    show_full_result_count = False
     fieldsets = [
         (None, {
             "description": "Основная информации об элементе справочника",
             "fields": ("version_directory", "code", "value"),
         }),
     ]
+
+
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    """ Административная форма для ключей API """
+    list_display = "name", "user", "prefix", "is_active", "created_at"
+    list_select_related = ("user",)
+    readonly_fields = ("prefix", "created_at")
+    raw_id_fields = ("user",)
+    fieldsets = [
+        (None, {
+            "description": "Ключ показывается один раз после создания, хранится только его хэш",
+            "fields": ("name", "user", "is_active", "prefix", "created_at"),
+        }),
+    ]
+
+    def save_model(self, request, obj, form, change):
+        key = None if change else obj.generate_key()
+        super().save_model(request, obj, form, change)
+
+        if key:
+            self.message_user(request, f"Ключ API: {key}", messages.WARNING)
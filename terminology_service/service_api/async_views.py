@@ -0,0 +1,228 @@
+from pathlib import Path
+from typing import AsyncIterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseBase, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework.permissions import AllowAny
+
+from .conditional import representation_etag, not_modified_response, set_validators
+from .renderers import NDJSONRenderer, dumps, astream_json, astream_ndjson
+from .routers import keep_replica_reads, replica_reads
+from .serializers import CheckSerializer
+from .services import ResolvedVersion, aresolve_version, aelement_exists, aversion_elements
+from .snapshots import find_snapshot
+from .views import DirectoryElementView, DirectoryCheckView
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Формат ответа (?format=) -> тип содержимого
+MEDIA_TYPES = {"json": JSON_MEDIA_TYPE, NDJSONRenderer.format: NDJSONRenderer.media_type}
+
+# Заголовки Accept, которым соответствует ответ в JSON
+JSON_ACCEPT = {"", "*/*", "application/*", JSON_MEDIA_TYPE}
+
+# Заголовки с учётными данными: их проверяют аутентификаторы DRF
+CREDENTIAL_HEADERS = ("HTTP_AUTHORIZATION", "HTTP_X_API_KEY")
+
+# Размер блока при отдаче снимка
+SNAPSHOT_BLOCK_SIZE = 64 * 1024
+
+
+def negotiate(request: HttpRequest, media_types: dict[str, str]) -> str | None:
+    """
+    Тип ответа для асинхронного представления, либо None, если запрос
+    требует согласования DRF (браузерный API, отступы и т.п.)
+    """
+    file_format = request.GET.get("format")
+    if file_format:
+        return media_types.get(file_format)
+
+    accepted = {
+        item.strip() for item in request.META.get("HTTP_ACCEPT", "").split(",")
+    }
+
+    if accepted <= JSON_ACCEPT:
+        return JSON_MEDIA_TYPE
+    if accepted == {NDJSONRenderer.media_type} and NDJSONRenderer.media_type in media_types.values():
+        return NDJSONRenderer.media_type
+
+    return None
+
+
+def json_response(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(dumps(data), status=status, content_type=JSON_MEDIA_TYPE)
+
+
+class AsyncFallbackView(View):
+    """
+    Асинхронное представление на Django async ORM. Запросы, которые оно
+    не обслуживает само, передаются синхронному представлению DRF: в том числе
+    все запросы с учётными данными и все запросы, если у представления DRF
+    есть проверки прав или ограничения частоты
+    """
+    http_method_names = ["get", "head", "options"]
+    fallback_view = None
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        with replica_reads():
+            if self.requires_drf(request):
+                response = await self.fallback(request, *args, **kwargs)
+            else:
+                response = await super().dispatch(request, *args, **kwargs)
+        return keep_replica_reads(response)
+
+    def requires_drf(self, request: HttpRequest) -> bool:
+        view = self.fallback_view
+        restricted = view.throttle_classes or any(
+            permission is not AllowAny for permission in view.permission_classes
+        )
+        return bool(restricted) or any(header in request.META for header in CREDENTIAL_HEADERS)
+
+    async def fallback(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        # Ответ DRF рендерится обработчиком Django, как и у синхронного представления
+        return await sync_to_async(self.fallback_view.as_view())(request, *args, **kwargs)
+
+    async def options(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        return await self.fallback(request, *args, **kwargs)
+
+
+class AsyncDirectoryElementView(AsyncFallbackView):
+    """ Asynchronous endpoint for getting a specific directory item """
+    fallback_view = DirectoryElementView
+
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        media_type = negotiate(request, MEDIA_TYPES)
+        # Пагинация и поиск обслуживаются синхронным представлением
+        paginated = {"cursor", "page_size", "q"} & request.GET.keys()
+
+        if media_type is None or paginated:
+            return await self.fallback(request, *args, **kwargs)
+
+        try:
+            directory_id = int(kwargs.get("id"))
+
+            resolved = await aresolve_version(directory_id, request.GET.get("version"))
+            file_format = NDJSONRenderer.format if media_type == NDJSONRenderer.media_type else "json"
+            snapshot = resolved and find_snapshot(
+                resolved.id,
+                resolved.updated_at,
+                file_format,
+                request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            )
+            etag = representation_etag(
+                request, directory_id, resolved,
+                media_type=media_type, content_coding=snapshot and snapshot[1],
+            )
+            last_modified = resolved.updated_at if resolved else None
+
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is None:
+                response = set_validators(
+                    await self.elements_response(request, resolved, media_type, snapshot),
+                    etag,
+                    last_modified,
+                )
+            else:
+                response = not_modified
+        except Exception as e:
+            response = json_response({"error": str(e)}, 404)
+
+        # Ответ может быть сжатым снимком, поэтому зависит от Accept-Encoding
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    async def elements_response(
+        self,
+        request: HttpRequest,
+        resolved: ResolvedVersion | None,
+        media_type: str,
+        snapshot: tuple[Path, str] | None = None,
+    ) -> HttpResponseBase:
+        version_id = resolved.id if resolved else None
+
+        if snapshot:
+            return self.snapshot_response(media_type, *snapshot)
+
+        if media_type == NDJSONRenderer.media_type:
+            return StreamingHttpResponse(
+                astream_ndjson(self.stream_rows(version_id)), content_type=media_type,
+            )
+        if request.GET.get("stream") in ("1", "true"):
+            return StreamingHttpResponse(
+                astream_json(self.stream_rows(version_id)), content_type=media_type,
+            )
+
+        if resolved is None:
+            return json_response({"elements": []})
+
+        # Полный список формируется через element_flight, как и синхронным представлением:
+        # одновременные запросы версии выполняют один запрос и публикуют снимок
+        content = await sync_to_async(DirectoryElementView.elements_content)(resolved)
+        return HttpResponse(content, content_type=media_type)
+
+    @staticmethod
+    def snapshot_response(media_type: str, path: Path, encoding: str) -> StreamingHttpResponse:
+        file = path.open("rb")
+
+        async def blocks() -> AsyncIterator[bytes]:
+            # Снимки лежат на локальном диске и сжаты, чтение блока не блокирует цикл событий заметно
+            with file:
+                while block := file.read(SNAPSHOT_BLOCK_SIZE):
+                    yield block
+
+        response = StreamingHttpResponse(blocks(), content_type=media_type)
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Length"] = str(path.stat().st_size)
+        return response
+
+    @staticmethod
+    async def stream_rows(version_id: int | None) -> AsyncIterator[tuple[str, str]]:
+        # values_list().aiterator() в Django 5.1 выполняет запрос вне потока, поэтому values()
+        elements = await aversion_elements(version_id)
+        rows = elements.values("code", "value") \
+            .aiterator(chunk_size=settings.ELEMENTS_STREAM_CHUNK_SIZE)
+
+        async for row in rows:
+            yield row["code"], row["value"]
+
+
+class AsyncDirectoryCheckView(AsyncFallbackView):
+    """ Asynchronous endpoint for checking if a directory element exists in the database """
+    fallback_view = DirectoryCheckView
+
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        media_type = negotiate(request, {"json": JSON_MEDIA_TYPE})
+
+        if media_type is None:
+            return await self.fallback(request, *args, **kwargs)
+
+        try:
+            directory_id = int(kwargs.get("id"))
+
+            serializer = CheckSerializer(data=request.GET.dict())
+
+            if not serializer.is_valid():
+                return json_response({"error": str(serializer.errors)}, 404)
+
+            resolved = await aresolve_version(
+                directory_id, serializer.validated_data.get("version")
+            )
+            etag = representation_etag(request, directory_id, resolved, media_type=media_type)
+            last_modified = resolved.updated_at if resolved else None
+
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            exists = await aelement_exists(
+                resolved,
+                serializer.validated_data.get("code"),
+                serializer.validated_data.get("value"),
+            )
+
+            return set_validators(json_response({"exists": exists}), etag, last_modified)
+        except Exception as e:
+            return json_response({"error": str(e)}, 404)
@@ -0,0 +1,65 @@
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.request import Request
+
+from .cache import LocalCache
+from .models import ApiKey
+
+# Проверенные ключи: хэш ключа -> пользователь (None - ключ не найден или отключён)
+api_key_cache = LocalCache(
+    max_size=settings.API_KEY_CACHE_SIZE, ttl=settings.API_KEY_CACHE_TTL,
+)
+_missing = object()
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    Аутентификация по ключу API из заголовка "Authorization: Api-Key <ключ>"
+    (или "X-Api-Key: <ключ>"). Ключ проверяется одним SHA-256 и поиском в кэше
+    процесса, к базе данных обращается только первая проверка ключа за TTL
+    """
+    keyword = "Api-Key"
+
+    def authenticate(self, request: Request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        digest = ApiKey.hash_key(key)
+        user = api_key_cache.get(digest, _missing)
+
+        if user is _missing:
+            user = self.load_user(digest)
+            api_key_cache.set(digest, user)
+
+        if user is None:
+            raise exceptions.AuthenticationFailed("Invalid API key.")
+
+        return user, digest
+
+    def get_key(self, request: Request) -> str | None:
+        header = request.META.get("HTTP_X_API_KEY")
+        if header:
+            return header
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Invalid API key header.")
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed("Invalid API key header.")
+
+    @staticmethod
+    def load_user(digest: str):
+        api_key = ApiKey.objects.select_related("user") \
+            .filter(digest=digest, is_active=True, user__is_active=True) \
+            .first()
+        return api_key.user if api_key else None
+
+    def authenticate_header(self, request: Request) -> str:
+        return self.keyword
@@ -0,0 +1,351 @@
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponseBase
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .models import Directory, VersionDirectory
+from .serializers import CursorField
+from .services import clear_caches, directories_state, version_elements
+
+
+@dataclass
+class Request:
+    """ Один запрос сценария нагрузки """
+    method: str
+    path: str
+    data: dict | None = None
+
+
+@dataclass
+class Result:
+    """ Результаты прогона одного сценария """
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def percentile(self, value: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[value - 1]
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> dict:
+        """ Метрики сценария для сравнения прогонов (задержки в мс) """
+        return {
+            "requests": len(self.latencies),
+            "p50": self.percentile(50) * 1000,
+            "p95": self.percentile(95) * 1000,
+            "p99": self.percentile(99) * 1000,
+            "queries": statistics.fmean(self.queries or [0]),
+            "throughput": self.throughput,
+            "errors": self.errors,
+        }
+
+    def row(self) -> str:
+        return (
+            f"{self.name:<16} {len(self.latencies):>8} {self.percentile(50) * 1000:>9.2f} "
+            f"{self.percentile(95) * 1000:>9.2f} {self.percentile(99) * 1000:>9.2f} "
+            f"{statistics.fmean(self.queries or [0]):>8.1f} {self.throughput:>10.1f} "
+            f"{self.errors:>6}"
+        )
+
+
+HEADER = (
+    f"{'endpoint':<16} {'requests':>8} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9} "
+    f"{'queries':>8} {'req/sec':>10} {'errors':>6}"
+)
+
+
+def sample_elements(rng: random.Random, count: int) -> list[dict]:
+    """
+    Случайная выборка элементов с их справочником и версией. Элементы читаются
+    через version_elements, поэтому в выборку попадают версии с любым способом хранения:
+    из каждой выбранной версии - подряд идущие элементы со случайного места
+    """
+    versions = list(VersionDirectory.objects.values_list("id", "version", "directory_id"))
+    if not versions:
+        return []
+
+    picks = Counter(rng.choice(versions) for _ in range(count))
+    samples = []
+
+    for (version_id, version, directory_id), size in sorted(picks.items()):
+        elements = version_elements(version_id)
+        offset = rng.randint(0, max(elements.count() - size, 0))
+
+        samples.extend(
+            {"code": code, "value": value, "version": version, "directory_id": directory_id}
+            for code, value in elements.values_list("code", "value")[offset:offset + size]
+        )
+
+    return samples
+
+
+def build_scenarios(rng: random.Random, requests: int) -> dict[str, list[Request]]:
+    """ Сценарии нагрузки на endpoint'ы service_api по данным из базы """
+    directory_ids = list(Directory.objects.values_list("id", flat=True))
+    elements = sample_elements(rng, requests) or [{}]
+    cursor = CursorField().to_representation(directories_state()[1])
+
+    def pick() -> dict:
+        return rng.choice(elements)
+
+    scenarios = {
+        "directory-list": [
+            Request("get", reverse("service_api:directory-list"))
+            for _ in range(requests)
+        ],
+        # Опрос ленты изменений без изменений с последней синхронизации
+        "changes": [
+            Request("get", reverse("service_api:changes"), {"since": cursor})
+            for _ in range(requests)
+        ],
+        "element": [
+            Request(
+                "get",
+                reverse("service_api:element", kwargs={"id": rng.choice(directory_ids)}),
+            )
+            for _ in range(requests)
+        ] if directory_ids else [],
+    }
+
+    versions = {}
+    for directory_id, version in VersionDirectory.objects \
+            .order_by("directory_id", "created_date").values_list("directory_id", "version"):
+        versions.setdefault(directory_id, []).append(version)
+
+    releases = [
+        (directory_id, *pair)
+        for directory_id, items in versions.items()
+        for pair in zip(items, items[1:])
+    ]
+    if releases:
+        scenarios["diff"] = []
+
+        for _ in range(requests):
+            directory_id, version_from, version_to = rng.choice(releases)
+            scenarios["diff"].append(Request(
+                "get",
+                reverse("service_api:diff", kwargs={"id": directory_id}),
+                {"from": version_from, "to": version_to},
+            ))
+
+    if elements[0]:
+        scenarios["lookup"] = [
+            Request("get", reverse("service_api:lookup"), {"code": pick()["code"]})
+            for _ in range(requests)
+        ]
+        scenarios["check"] = []
+        scenarios["check-bulk"] = []
+
+        for _ in range(requests):
+            element = pick()
+            scenarios["check"].append(Request(
+                "get",
+                reverse(
+                    "service_api:check",
+                    kwargs={"id": element["directory_id"]},
+                ),
+                {
+                    "code": element["code"],
+                    "value": element["value"],
+                    "version": element["version"],
+                },
+            ))
+
+            element = pick()
+            scenarios["check-bulk"].append(Request(
+                "post",
+                reverse(
+                    "service_api:check-bulk",
+                    kwargs={"id": element["directory_id"]},
+                ),
+                {
+                    "version": element["version"],
+                    "elements": [
+                        {"code": item["code"], "value": item["value"]}
+                        for item in rng.sample(elements, min(100, len(elements)))
+                    ],
+                },
+            ))
+
+    return scenarios
+
+
+def run_scenario(
+    name: str, requests: list[Request], client: Client, cold: bool = False,
+) -> Result:
+    """ Выполняет запросы сценария последовательно и собирает метрики """
+    result = Result(name)
+    started = time.perf_counter()
+
+    for request in requests:
+        if cold:
+            clear_caches()
+
+        with CaptureQueriesContext(connection) as queries:
+            request_started = time.perf_counter()
+
+            if request.method == "post":
+                response = client.post(request.path, request.data, content_type="application/json")
+            else:
+                response = client.get(request.path, request.data)
+
+            result.latencies.append(time.perf_counter() - request_started)
+
+        result.queries.append(len(queries))
+        result.errors += response.status_code >= 400
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def _queries(response: HttpResponseBase) -> int:
+    """ Число SQL-запросов из заголовка Server-Timing (QueryMetricsMiddleware) """
+    match = re.search(r'desc="(\d+) queries"', response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def run_concurrent(name: str, requests: list[Request], concurrency: int) -> Result:
+    """
+    Выполняет запросы сценария через WSGI-обработчик тестового клиента
+    в concurrency потоках: по потоку (и соединению с БД) на запрос в работе
+    """
+    result = Result(name)
+    local = threading.local()
+    lock = threading.Lock()
+
+    def send(request: Request) -> None:
+        if not hasattr(local, "client"):
+            local.client = Client(SERVER_NAME="127.0.0.1")
+
+        request_started = time.perf_counter()
+
+        if request.method == "post":
+            response = local.client.post(request.path, request.data, content_type="application/json")
+        else:
+            response = local.client.get(request.path, request.data)
+
+        latency = time.perf_counter() - request_started
+
+        with lock:
+            result.latencies.append(latency)
+            result.queries.append(_queries(response))
+            result.errors += response.status_code >= 400
+
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, requests))
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_concurrent_asgi(name: str, requests: list[Request], concurrency: int) -> Result:
+    """
+    Выполняет запросы сценария через ASGI-обработчик в одном цикле событий,
+    не более concurrency запросов одновременно
+    """
+    result = Result(name)
+    client = AsyncClient()
+
+    async def send(request: Request, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            request_started = time.perf_counter()
+
+            if request.method == "post":
+                response = await client.post(request.path, request.data, content_type="application/json")
+            else:
+                response = await client.get(request.path, request.data)
+
+            result.latencies.append(time.perf_counter() - request_started)
+            result.queries.append(_queries(response))
+            result.errors += response.status_code >= 400
+
+    async def main() -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(send(request, semaphore) for request in requests))
+
+    started = time.perf_counter()
+
+    # Асинхронный тестовый клиент всегда передаёт заголовок Host: testserver
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        asyncio.run(main())
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+# Профили настроек, которые сравнивает benchmark_api --startup и --profiles
+SETTINGS_PROFILES = ["terminology_service.settings", "terminology_service.settings_api"]
+
+# Холодный старт рабочего процесса: настройка Django, обработчик WSGI, загрузка маршрутов
+STARTUP_CODE = (
+    "from django.core.wsgi import get_wsgi_application; "
+    "from django.urls import get_resolver; "
+    "get_wsgi_application(); get_resolver().url_patterns"
+)
+
+
+def measure_startup(settings_modules: list[str], runs: int) -> dict[str, list[float]]:
+    """
+    Время холодного старта процесса с каждым профилем настроек, мс. Каждый замер -
+    новый процесс; профили чередуются, чтобы фоновая нагрузка влияла на них одинаково
+    """
+    timings = {settings_module: [] for settings_module in settings_modules}
+
+    for _ in range(runs):
+        for settings_module in settings_modules:
+            started = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-c", STARTUP_CODE],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, "DJANGO_SETTINGS_MODULE": settings_module},
+                check=True,
+            )
+            timings[settings_module].append((time.perf_counter() - started) * 1000)
+
+    return timings
+
+
+def measure_profiles(settings_modules: list[str], arguments: list[str]) -> dict[str, dict[str, dict]]:
+    """
+    Результаты сценариев benchmark_api с каждым профилем настроек: профиль
+    выбирается при запуске процесса, поэтому каждый прогон - отдельный процесс
+    """
+    results = {}
+
+    for settings_module in settings_modules:
+        completed = subprocess.run(
+            [sys.executable, "manage.py", "benchmark_api", "--json", *arguments],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": settings_module},
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results[settings_module] = json.loads(completed.stdout)
+
+    return results
@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime
+
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.request import Request
+
+
+def representation_etag(
+    request: Request | HttpRequest,
+    *parts,
+    media_type: str | None = None,
+    content_coding: str | None = None,
+) -> str:
+    """
+    Строгий ETag представления: хэш от переданных частей (версия данных),
+    строки запроса, согласованного типа ответа и кодировки содержимого
+    (у сжатого снимка и несжатого ответа разные ETag). Для запросов без
+    согласования DRF (асинхронные представления) тип ответа передаётся в media_type
+    """
+    digest = hashlib.sha1()
+    media_type = media_type or request.accepted_media_type
+    coding = (content_coding,) if content_coding else ()
+
+    for part in (*parts, request.META.get("QUERY_STRING", ""), media_type, *coding):
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+
+    return f'"{digest.hexdigest()}"'
+
+
+def not_modified_response(
+    request: Request | HttpRequest, etag: str, last_modified: datetime | None,
+) -> HttpResponseBase | None:
+    """ Возвращает ответ 304/412, если у клиента актуальная копия, иначе None """
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(
+    response: HttpResponseBase, etag: str, last_modified: datetime | None,
+) -> HttpResponseBase:
+    """ Добавляет заголовки ETag и Last-Modified к успешному ответу """
+    if 200 <= response.status_code < 300:
+        response.headers["ETag"] = etag
+
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+
+    patch_vary_headers(response, ["Accept"])
+    return response
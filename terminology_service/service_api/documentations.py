@@ -1,6 +1,7 @@
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, \
     OpenApiResponse, inline_serializer
-from rest_framework.fields import CharField, BooleanField
+from rest_framework.fields import CharField, BooleanField, DateField, DateTimeField, \
+    IntegerField, ListField
 
 from service_api.serializers import DirectorySerializer, DirectoryElementSerializer
 
@@ -25,6 +26,25 @@ parameter_version = OpenApiParameter(
         ),
     ],
 )
+parameters_pagination = [
+    OpenApiParameter(
+        name="cursor",
+        type=str,
+        required=False,
+        description="Opaque cursor from the `next`/`previous` link of the previous page. "
+                    "Enables keyset pagination.",
+    ),
+    OpenApiParameter(
+        name="page_size",
+        type=int,
+        required=False,
+        description="Number of records per page. Enables keyset pagination.",
+    ),
+]
+response_pagination_fields = {
+    "next": CharField(required=False, allow_null=True),
+    "previous": CharField(required=False, allow_null=True),
+}
 
 directory_docs = extend_schema(
     tags=['Directory'],
@@ -44,12 +64,16 @@ directory_docs = extend_schema(
                 ),
             ],
         ),
+        *parameters_pagination,
     ],
     responses={
         200: OpenApiResponse(
             response=inline_serializer(
                 name='Directories',
-                fields={"refbooks": DirectorySerializer(many=True)},
+                fields={
+                    "refbooks": DirectorySerializer(many=True),
+                    **response_pagination_fields,
+                },
             ),
             description="Returns on successful request",
         ),
@@ -60,12 +84,47 @@ directory_docs = extend_schema(
 directory_element_docs = extend_schema(
     tags=['Directory'],
     summary="Getting a specific directory item",
-    parameters=[parameter_version],
+    description="With `Accept: application/x-ndjson` (or `?format=ndjson`) "
+                "the elements are streamed one JSON object per line.",
+    parameters=[
+        parameter_version,
+        OpenApiParameter(
+            name="stream",
+            type=bool,
+            required=False,
+            description="Streams the response with bounded memory usage, "
+                        "useful for very large directories.",
+        ),
+        OpenApiParameter(
+            name="q",
+            type=str,
+            required=False,
+            description="Searches elements by code prefix and words of the value. "
+                        "Results are ranked and paginated with `limit`/`offset`.",
+            examples=[OpenApiExample(name="q", value="A01.00 acute")],
+        ),
+        OpenApiParameter(
+            name="limit",
+            type=int,
+            required=False,
+            description="Number of search results per page.",
+        ),
+        OpenApiParameter(
+            name="offset",
+            type=int,
+            required=False,
+            description="Number of search results to skip.",
+        ),
+        *parameters_pagination,
+    ],
     responses={
         200: OpenApiResponse(
             response=inline_serializer(
                 name='Directory-elements',
-                fields={"elements": DirectoryElementSerializer(many=True)},
+                fields={
+                    "elements": DirectoryElementSerializer(many=True),
+                    **response_pagination_fields,
+                },
             ),
             description="Returns on successful request",
         ),
@@ -116,3 +175,196 @@ directory_check_docs = extend_schema(
         404: response_404,
     },
 )
+
+directory_bulk_check_docs = extend_schema(
+    tags=['Directory'],
+    summary="Checking if a batch of directory elements exists in the database",
+    request=inline_serializer(
+        name='Bulk-check',
+        fields={
+            "version": CharField(
+                required=False,
+                help_text="Directory version, the current one is used if omitted",
+            ),
+            "elements": inline_serializer(
+                name='Element-pair',
+                fields={"code": CharField(), "value": CharField()},
+                many=True,
+            ),
+        },
+    ),
+    examples=[
+        OpenApiExample(
+            name="elements",
+            value={
+                "version": "1.0",
+                "elements": [
+                    {"code": "Code1", "value": "Value1"},
+                    {"code": "Code2", "value": "Value2"},
+                ],
+            },
+            request_only=True,
+        ),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name='Response-boolean-list',
+                fields={"exists": ListField(child=BooleanField())},
+            ),
+            description="Returns on successful request, "
+                        "one flag per element in the order of the request",
+        ),
+        404: response_404,
+    },
+)
+
+element_fields = {"code": CharField(), "value": CharField()}
+
+directory_diff_docs = extend_schema(
+    tags=['Directory'],
+    summary="Getting the difference between two versions of a directory",
+    description="Only the delta is returned: elements added in `to`, removed from `from` "
+                "and elements whose value changed, ordered by code.",
+    parameters=[
+        OpenApiParameter(
+            name="from",
+            type=str,
+            required=True,
+            description="The version to compare from",
+            examples=[OpenApiExample(name="from", value="1.0")],
+        ),
+        OpenApiParameter(
+            name="to",
+            type=str,
+            required=True,
+            description="The version to compare to",
+            examples=[OpenApiExample(name="to", value="2.0")],
+        ),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name='Directory-diff',
+                fields={
+                    "from": CharField(),
+                    "to": CharField(),
+                    "added": inline_serializer(
+                        name='Diff-added', fields=element_fields, many=True,
+                    ),
+                    "removed": inline_serializer(
+                        name='Diff-removed', fields=element_fields, many=True,
+                    ),
+                    "changed": inline_serializer(
+                        name='Diff-changed',
+                        fields={**element_fields, "previous_value": CharField()},
+                        many=True,
+                    ),
+                },
+            ),
+            description="Returns on successful request",
+        ),
+        404: response_404,
+    },
+)
+
+element_lookup_docs = extend_schema(
+    tags=['Directory'],
+    summary="Finding the reference books that contain an element code",
+    description="Returns the reference books whose version active on the date "
+                "contains an element with the code, with that version and the element value.",
+    parameters=[
+        OpenApiParameter(
+            name="code",
+            type=str,
+            required=True,
+            description="Element code",
+            examples=[OpenApiExample(name="code", value="Code1")],
+        ),
+        OpenApiParameter(
+            name="date",
+            type=str,
+            required=False,
+            description="Versions active on the date are searched, today by default",
+            examples=[
+                OpenApiExample(name="date", value="2023-12-28", description="format: YYYY-MM-DD"),
+            ],
+        ),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name='Element-lookup',
+                fields={
+                    "refbooks": inline_serializer(
+                        name='Element-lookup-refbook',
+                        fields={
+                            "id": IntegerField(),
+                            "code": CharField(),
+                            "name": CharField(),
+                            "version": CharField(),
+                            "value": CharField(),
+                        },
+                        many=True,
+                    ),
+                },
+            ),
+            description="Returns on successful request",
+        ),
+        404: response_404,
+    },
+)
+
+directory_changes_docs = extend_schema(
+    tags=['Directory'],
+    summary="Getting the reference books changed after a cursor",
+    description="Returns the reference books changed after the cursor (the book itself, "
+                "its versions or their elements) with all their versions, the ids of deleted "
+                "reference books and the cursor for the next request. Without `since` all "
+                "reference books are returned. The cursor lags behind the current time, so "
+                "recent changes can be returned again by the next request.",
+    parameters=[
+        OpenApiParameter(
+            name="since",
+            type=int,
+            required=False,
+            description="The `cursor` of the previous response",
+            examples=[OpenApiExample(name="since", value=1703721600000000)],
+        ),
+    ],
+    responses={
+        200: OpenApiResponse(
+            response=inline_serializer(
+                name='Directory-changes',
+                fields={
+                    "cursor": IntegerField(),
+                    "refbooks": inline_serializer(
+                        name='Directory-changes-refbook',
+                        fields={
+                            "id": IntegerField(),
+                            "code": CharField(),
+                            "name": CharField(),
+                            "description": CharField(),
+                            "updated_at": DateTimeField(),
+                            "versions": inline_serializer(
+                                name='Directory-changes-version',
+                                fields={
+                                    "id": IntegerField(),
+                                    "version": CharField(),
+                                    "created_date": DateField(),
+                                    "valid_to": DateField(allow_null=True),
+                                    "updated_at": DateTimeField(),
+                                },
+                                many=True,
+                            ),
+                        },
+                        many=True,
+                    ),
+                    "deleted": ListField(child=IntegerField()),
+                },
+            ),
+            description="Returns on successful request",
+        ),
+        404: response_404,
+    },
+)
@@ -0,0 +1,158 @@
+import json
+import uuid
+from datetime import datetime
+from typing import Callable, Iterable
+
+from .cache import LocalCache
+
+Pair = tuple[str, str]
+Loader = Callable[[int], Iterable[Pair]]
+# Идентификатор и дата изменения версии (services.ResolvedVersion): индекс
+# версии, построенный до её изменения, не используется
+Version = tuple[int, datetime]
+
+
+class LocalMembershipIndex:
+    """
+    Индекс принадлежности пар (код, значение) версии справочника,
+    хранящийся в памяти процесса. Строится лениво при первом обращении.
+    """
+
+    def __init__(self, loader: Loader, max_versions: int = 64, ttl: float | None = None):
+        self.loader = loader
+        self._sets = LocalCache(max_size=max_versions, ttl=ttl)
+
+    def _members(self, version: Version) -> frozenset:
+        members = self._sets.get(tuple(version))
+
+        if members is None:
+            version_id, _ = version
+            members = frozenset(self.loader(version_id))
+            self._sets.delete_many(lambda key: key[0] == version_id)
+            self._sets.set(tuple(version), members)
+
+        return members
+
+    def is_loaded(self, version: Version) -> bool:
+        """ Построен ли индекс версии (проверка не обращается к БД) """
+        return self._sets.get(tuple(version)) is not None
+
+    def contains(self, version: Version, code: str, value: str) -> bool:
+        return (code, value) in self._members(version)
+
+    def contains_many(self, version: Version, pairs: Iterable[Pair]) -> list[bool]:
+        members = self._members(version)
+        return [tuple(pair) in members for pair in pairs]
+
+    def invalidate(self, version_id: int) -> None:
+        self._sets.delete_many(lambda key: key[0] == version_id)
+
+    def clear(self) -> None:
+        self._sets.clear()
+
+
+class RedisMembershipIndex:
+    """
+    Индекс принадлежности, хранящийся в Redis-совместимом хранилище
+    в виде множества на каждую версию справочника. Клиент передаётся извне,
+    поэтому локально его можно заменить заглушкой.
+    """
+
+    def __init__(
+        self,
+        loader: Loader,
+        client,
+        prefix: str = "service_api:members:",
+        ttl: int | None = None,
+        batch_size: int = 5000,
+    ):
+        self.loader = loader
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.batch_size = batch_size
+
+    def _key(self, version_id: int) -> str:
+        return f"{self.prefix}{version_id}"
+
+    @staticmethod
+    def _encode(pair: Pair) -> str:
+        return json.dumps(list(pair), ensure_ascii=False)
+
+    @staticmethod
+    def _marker(version: Version) -> str:
+        """
+        Служебный элемент множества: признак того, что индекс построен для этой
+        даты изменения версии (пары кодируются списками JSON и с ним не совпадают)
+        """
+        return f"@{version[1].isoformat()}"
+
+    def _build(self, version: Version) -> None:
+        version_id, _ = version
+        key = self._key(version_id)
+        # Своё временное множество у каждого построения: одновременные построения
+        # индекса версии не смешивают элементы, последнее целиком заменяет ключ
+        tmp_key = f"{key}:build:{uuid.uuid4().hex}"
+        batch = [self._marker(version)]
+
+        try:
+            for pair in self.loader(version_id):
+                batch.append(self._encode(pair))
+
+                if len(batch) >= self.batch_size:
+                    self.client.sadd(tmp_key, *batch)
+                    batch = []
+
+            if batch:
+                self.client.sadd(tmp_key, *batch)
+
+            self.client.rename(tmp_key, key)
+        except BaseException:
+            self.client.delete(tmp_key)
+            raise
+
+        if self.ttl:
+            self.client.expire(key, self.ttl)
+
+    def contains_many(self, version: Version, pairs: Iterable[Pair]) -> list[bool]:
+        key = self._key(version[0])
+        members = [self._marker(version)] + [self._encode(pair) for pair in pairs]
+
+        result = self.client.smismember(key, members)
+
+        if not result[0]:
+            self._build(version)
+            result = self.client.smismember(key, members)
+
+        return [bool(item) for item in result[1:]]
+
+    def is_loaded(self, version: Version) -> bool:
+        """ Состояние индекса в Redis известно только после сетевого запроса """
+        return False
+
+    def contains(self, version: Version, code: str, value: str) -> bool:
+        return self.contains_many(version, [(code, value)])[0]
+
+    def invalidate(self, version_id: int) -> None:
+        self.client.delete(self._key(version_id))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def create_membership_index(
+    loader: Loader,
+    backend: str = "local",
+    redis_url: str | None = None,
+    max_versions: int = 64,
+    ttl: float | None = None,
+):
+    """ Создаёт индекс принадлежности по настройкам проекта """
+    if backend == "redis":
+        import redis
+
+        client = redis.Redis.from_url(redis_url, decode_responses=True)
+        return RedisMembershipIndex(loader, client, ttl=int(ttl) if ttl else None)
+
+    return LocalMembershipIndex(loader, max_versions=max_versions, ttl=ttl)
@@ -0,0 +1,150 @@
+import json
+import random
+import statistics
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.test import Client
+
+from service_api.benchmarks import (
+    HEADER,
+    SETTINGS_PROFILES,
+    build_scenarios,
+    measure_profiles,
+    measure_startup,
+    run_scenario,
+    run_concurrent,
+    run_concurrent_asgi,
+)
+
+
+class Command(BaseCommand):
+    """
+    Команда нагружает endpoint'ы service_api и выводит задержки (p50/p95/p99),
+    число SQL-запросов на запрос и пропускную способность по каждому из них.
+    С --concurrency запросы выполняются параллельно: потоками через WSGI-обработчик,
+    либо (--asgi) задачами одного цикла событий через ASGI-обработчик.
+    С --startup сравнивает время холодного старта процесса с полным и API-профилем настроек,
+    с --profiles - задержки тех же сценариев с каждым из профилей (накладные расходы middleware).
+    """
+    help = "Benchmarks the service_api endpoints against the current database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=10, help="Warmup requests per endpoint")
+        parser.add_argument(
+            "--endpoint", action="append", help="Only run the given endpoint (repeatable)",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear in-process caches before each request (sequential runs only)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--concurrency", type=int, default=1, help="Requests in flight at the same time",
+        )
+        parser.add_argument(
+            "--asgi", action="store_true", help="Send requests through the ASGI handler",
+        )
+        parser.add_argument(
+            "--startup",
+            type=int,
+            metavar="RUNS",
+            help="Only measure the cold start of each settings profile over RUNS processes",
+        )
+        parser.add_argument(
+            "--profiles",
+            action="store_true",
+            help="Run the scenarios under each settings profile and compare the latencies",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options["startup"]:
+            return self.startup(options["startup"])
+        if options["profiles"]:
+            return self.profiles(options)
+
+        rng = random.Random(options["seed"])
+        client = Client(SERVER_NAME="127.0.0.1")
+        scenarios = build_scenarios(rng, options["requests"] + options["warmup"])
+
+        concurrency = options["concurrency"]
+
+        results = {}
+
+        if (options["asgi"] or concurrency > 1) and not options["json"]:
+            self.stdout.write(
+                f"handler: {'asgi' if options['asgi'] else 'wsgi'}, "
+                f"async views: {'on' if settings.ASYNC_VIEWS else 'off'}, "
+                f"concurrency: {concurrency}"
+            )
+
+        if not options["json"]:
+            self.stdout.write(HEADER)
+
+        for name, requests in scenarios.items():
+            if options["endpoint"] and name not in options["endpoint"]:
+                continue
+            if not requests:
+                # Вывод в JSON читается сравнением профилей, предупреждения - в stderr
+                output = self.stderr if options["json"] else self.stdout
+                output.write(self.style.WARNING(f"{name}: no data, skipped"))
+                continue
+
+            warmup, measured = requests[:options["warmup"]], requests[options["warmup"]:]
+
+            if options["asgi"]:
+                run_concurrent_asgi(name, warmup, concurrency)
+                result = run_concurrent_asgi(name, measured, concurrency)
+            elif concurrency > 1:
+                run_concurrent(name, warmup, concurrency)
+                result = run_concurrent(name, measured, concurrency)
+            else:
+                run_scenario(name, warmup, client, options["cold"])
+                result = run_scenario(name, measured, client, options["cold"])
+
+            if options["json"]:
+                results[name] = result.summary()
+            else:
+                self.stdout.write(result.row())
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+
+    def startup(self, runs: int) -> None:
+        self.stdout.write(f"{'settings':<36}{'median, ms':>12}{'min, ms':>10}")
+
+        for settings_module, timings in measure_startup(SETTINGS_PROFILES, runs).items():
+            self.stdout.write(
+                f"{settings_module:<36}{statistics.median(timings):>12.1f}{min(timings):>10.1f}"
+            )
+
+    def profiles(self, options: dict) -> None:
+        arguments = [
+            f"--requests={options['requests']}",
+            f"--warmup={options['warmup']}",
+            f"--seed={options['seed']}",
+            f"--concurrency={options['concurrency']}",
+            *(["--cold"] if options["cold"] else []),
+            *(["--asgi"] if options["asgi"] else []),
+            *(f"--endpoint={name}" for name in options["endpoint"] or []),
+        ]
+        (full, full_results), (api, api_results) = measure_profiles(SETTINGS_PROFILES, arguments).items()
+        self.stdout.write(f"full: {full}, api: {api}")
+        self.stdout.write(
+            f"{'endpoint':<16} {'p50 full':>9} {'p50 api':>9} {'diff':>8} "
+            f"{'p95 full':>9} {'p95 api':>9} {'diff':>8}"
+        )
+
+        for name, result in full_results.items():
+            other = api_results.get(name)
+            if other is None:
+                continue
+
+            self.stdout.write(
+                f"{name:<16} {result['p50']:>9.2f} {other['p50']:>9.2f} "
+                f"{other['p50'] - result['p50']:>+8.2f} {result['p95']:>9.2f} "
+                f"{other['p95']:>9.2f} {other['p95'] - result['p95']:>+8.2f}"
+            )
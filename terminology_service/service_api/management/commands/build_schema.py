@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from service_api.schema import build_schema
+
+
+class Command(BaseCommand):
+    """ Команда формирует файлы схемы OpenAPI, которые отдаёт /api/schema/ """
+    help = "Renders the OpenAPI schema to files served by /api/schema/"
+
+    def handle(self, *args, **options):
+        for path in build_schema():
+            self.stdout.write(f"{path}: {path.stat().st_size} bytes")
+
+        self.stdout.write(self.style.SUCCESS("OpenAPI schema built."))
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+
+from service_api.models import VersionDirectory
+from service_api.snapshots import build_snapshot
+
+
+class Command(BaseCommand):
+    """ Команда строит сжатые снимки элементов версий справочников """
+    help = "Builds precompressed JSON/NDJSON snapshots of refbook versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "versions", nargs="*", type=int, help="Version ids (default: all versions)",
+        )
+
+    def handle(self, *args, **options):
+        versions = VersionDirectory.objects.order_by("id").values_list("id", flat=True)
+
+        if options["versions"]:
+            versions = versions.filter(id__in=options["versions"])
+
+        for version_id in versions:
+            paths = build_snapshot(version_id)
+            size = sum(path.stat().st_size for path in paths)
+            self.stdout.write(f"Version #{version_id}: {len(paths)} files, {size} bytes")
+
+        self.stdout.write(self.style.SUCCESS("Snapshots built."))
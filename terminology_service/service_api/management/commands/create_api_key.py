@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from service_api.models import ApiKey
+
+
+class Command(BaseCommand):
+    """ Команда создаёт ключ API пользователя """
+    help = "Creates an API key for a user and prints it (the key is shown only once)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="User the key authenticates as")
+        parser.add_argument("--name", default="API key", help="Key name")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options["username"]).first()
+
+        if user is None:
+            raise CommandError(f"User {options['username']!r} not found")
+
+        api_key = ApiKey(user=user, name=options["name"])
+        key = api_key.generate_key()
+        api_key.save()
+
+        self.stdout.write(key)
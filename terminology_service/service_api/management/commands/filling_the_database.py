@@ -1,43 +1,137 @@
 import random
-from sqlite3 import Date
+import string
+import time
+from datetime import date, timedelta
 
 from django.core.management import BaseCommand
 from django.db import transaction, IntegrityError
 
 from service_api.models import Directory, VersionDirectory, DirectoryElement
+from service_api.services import clear_caches, store_shared_elements
+
+WORDS = (
+    "acute", "chronic", "primary", "secondary", "unspecified", "other", "left", "right",
+    "bilateral", "infection", "disorder", "syndrome", "fracture", "injury", "disease",
+    "lesion", "neoplasm", "benign", "malignant", "congenital", "complication", "upper",
+    "lower", "limb", "organ", "tissue", "blood", "heart", "lung", "kidney", "liver",
+    "skin", "bone", "joint", "muscle", "nerve", "vessel", "gland", "duct", "cell",
+)
 
 
 class Command(BaseCommand):
-    """ Команда заполняет базу данных тестовыми записями. """
-    @transaction.atomic
+    """
+    Команда заполняет базу данных тестовыми записями: справочники × версии × элементы.
+    Данные генерируются детерминированно по seed и записываются пакетами.
+    """
+    help = "Generates synthetic refbooks, versions and elements"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directories", type=int, default=9)
+        parser.add_argument("--versions", type=int, default=1, help="Versions per refbook")
+        parser.add_argument("--elements", type=int, default=9, help="Elements per version")
+        parser.add_argument(
+            "--churn",
+            type=float,
+            default=0.02,
+            help="Share of elements added, removed or changed between versions",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--storage",
+            choices=[choice for choice, _ in VersionDirectory.STORAGE_CHOICES],
+            default=VersionDirectory.STORAGE_ROWS,
+            help="Element storage of the generated versions",
+        )
+
     def handle(self, *args, **options):
         try:
             self.stdout.write("Creates test data...")
-            count = 9
+            started = time.monotonic()
+            rng = random.Random(options["seed"])
+
+            with transaction.atomic():
+                total = self.generate(rng, options)
+
+            clear_caches()
+            self.stdout.write(self.style.SUCCESS(
+                f"Data created: {total} elements in {time.monotonic() - started:.1f}s."
+            ))
+        except IntegrityError:
+            self.stdout.write(self.style.ERROR(f"Data already exists."))
 
-            directories = [Directory.objects.get_or_create(
+    def generate(self, rng: random.Random, options) -> int:
+        directories = Directory.objects.bulk_create([
+            Directory(
                 code=f"Code{i}",
                 name=f"Name{i}",
                 description=f"Description{i}",
-            ) for i in range(1, count + 1)]
-
-            version_directories = [VersionDirectory.objects.get_or_create(
-                directory=random.choice(directories)[0],
-                version=f"{i}.0",
-                created_date=Date(
-                    year=random.randint(2010, 2024),
-                    month=random.randint(1, 12),
-                    day=random.randint(1, 28)
-                ),
-            ) for i in range(1, count + 1)]
-
-            for i in range(1, count + 1):
-                DirectoryElement.objects.get_or_create(
-                    version_directory=random.choice(version_directories)[0],
-                    code=f"Code{i}",
-                    value=f"Value{i}",
+            ) for i in range(1, options["directories"] + 1)
+        ])
+        total = 0
+
+        for directory in directories:
+            created_date = date(2010, 1, 1) + timedelta(days=rng.randint(0, 365))
+            elements = self.initial_elements(rng, options["elements"])
+
+            for number in range(1, options["versions"] + 1):
+                version = VersionDirectory.objects.create(
+                    directory=directory,
+                    version=f"{number}.0",
+                    created_date=created_date,
+                    storage=options["storage"],
                 )
+                pairs = list(elements.items())
 
-            self.stdout.write(self.style.SUCCESS(f"Data created."))
-        except IntegrityError:
-            self.stdout.write(self.style.ERROR(f"Data already exists."))
+                for index in range(0, len(pairs), options["batch_size"]):
+                    self.write_batch(version, pairs[index:index + options["batch_size"]])
+
+                total += len(pairs)
+                created_date += timedelta(days=rng.randint(30, 365))
+                elements = self.next_elements(rng, elements, options["churn"])
+
+        return total
+
+    @staticmethod
+    def write_batch(version: VersionDirectory, pairs: list[tuple[str, str]]) -> None:
+        if version.storage == VersionDirectory.STORAGE_SHARED:
+            store_shared_elements(version.id, pairs)
+        else:
+            DirectoryElement.objects.bulk_create([
+                DirectoryElement(version_directory_id=version.id, code=code, value=value)
+                for code, value in pairs
+            ])
+
+    @staticmethod
+    def make_code(rng: random.Random) -> str:
+        return f"{rng.choice(string.ascii_uppercase)}{rng.randint(0, 99):02d}." \
+               f"{rng.randint(0, 9999):04d}"
+
+    @staticmethod
+    def make_value(rng: random.Random) -> str:
+        # Длина наименований распределена неравномерно: в основном короткие
+        words = min(int(rng.expovariate(0.4)) + 1, 12)
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def initial_elements(self, rng: random.Random, count: int) -> dict[str, str]:
+        elements = {}
+        while len(elements) < count:
+            elements[self.make_code(rng)] = self.make_value(rng)
+        return elements
+
+    def next_elements(
+        self, rng: random.Random, elements: dict[str, str], churn: float,
+    ) -> dict[str, str]:
+        """ Следующая версия: большая часть элементов сохраняется, часть меняется """
+        elements = dict(elements)
+        changes = int(len(elements) * churn)
+        codes = rng.sample(sorted(elements), min(changes * 2, len(elements)))
+
+        for code in codes[:changes]:
+            del elements[code]
+        for code in codes[changes:]:
+            elements[code] = self.make_value(rng)
+        for _ in range(changes):
+            elements[self.make_code(rng)] = self.make_value(rng)
+
+        return elements
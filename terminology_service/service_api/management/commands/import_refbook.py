@@ -0,0 +1,181 @@
+import csv
+import json
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction, IntegrityError
+
+from service_api.models import Directory, VersionDirectory, DirectoryElement
+from service_api.services import touch_version, membership_index, store_shared_elements
+from service_api.snapshots import build_snapshot
+
+
+class Command(BaseCommand):
+    """
+    Команда загружает новую версию справочника из файла CSV, NDJSON или JSON.
+    Элементы записываются пакетами через bulk_create в одной транзакции:
+    собственными строками версии, либо (--storage shared) ссылками на общие
+    пары код/значение, которые уже есть в других версиях.
+    """
+    help = "Imports a new refbook version from a CSV, NDJSON or JSON file"
+    formats = "csv", "ndjson", "json"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path, help="File with code/value elements")
+        parser.add_argument("--directory", required=True, help="Refbook code")
+        parser.add_argument("--refbook-version", required=True, help="Version number")
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            default=date.today(),
+            help="Version start date, YYYY-MM-DD (default: today)",
+        )
+        parser.add_argument(
+            "--name", help="Refbook name, creates the refbook if it does not exist",
+        )
+        parser.add_argument("--description", default="", help="Refbook description")
+        parser.add_argument(
+            "--format", choices=self.formats, help="File format (default: by extension)",
+        )
+        parser.add_argument("--delimiter", default=",", help="CSV delimiter")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--storage",
+            choices=[choice for choice, _ in VersionDirectory.STORAGE_CHOICES],
+            default=settings.ELEMENT_STORAGE,
+            help="Element storage of the version (default: ELEMENT_STORAGE setting)",
+        )
+        parser.add_argument(
+            "--no-snapshot",
+            action="store_true",
+            help="Do not build precompressed snapshots of the imported version",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+
+        if file_format not in self.formats:
+            raise CommandError(f"Unknown file format: {path.suffix!r}, use --format.")
+        if not path.is_file():
+            raise CommandError(f"File not found: {path}")
+
+        started = time.monotonic()
+
+        try:
+            with transaction.atomic():
+                directory = self.get_directory(options)
+                version = VersionDirectory.objects.create(
+                    directory=directory,
+                    version=options["refbook_version"],
+                    created_date=options["date"],
+                    storage=options["storage"],
+                )
+                total = self.load_elements(
+                    version,
+                    self.read_rows(path, file_format, options["delimiter"]),
+                    options["batch_size"],
+                    started,
+                )
+                touch_version(version.id)
+        except IntegrityError as e:
+            raise CommandError(f"Version conflicts with existing data: {e}")
+        except (ValueError, csv.Error) as e:
+            raise CommandError(f"Malformed file: {e}")
+
+        membership_index.invalidate(version.id)
+
+        if not options["no_snapshot"]:
+            build_snapshot(version.id)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {total} elements into {directory.code} v{version.version} "
+            f"in {elapsed:.1f}s ({total / elapsed if elapsed else total:.0f} rows/sec)."
+        ))
+
+    def get_directory(self, options) -> Directory:
+        directory = Directory.objects.filter(code=options["directory"]).first()
+
+        if directory is None:
+            if not options["name"]:
+                raise CommandError(
+                    f"Refbook {options['directory']!r} not found, pass --name to create it."
+                )
+            directory = Directory.objects.create(
+                code=options["directory"],
+                name=options["name"],
+                description=options["description"],
+            )
+
+        return directory
+
+    def load_elements(
+        self, version: VersionDirectory, rows: Iterator, batch_size: int, started: float,
+    ) -> int:
+        code_length = DirectoryElement._meta.get_field("code").max_length
+        value_length = DirectoryElement._meta.get_field("value").max_length
+        seen_codes = set()
+        batch = []
+        total = 0
+
+        for number, row in enumerate(rows, 1):
+            code = row.get("code") if isinstance(row, dict) else None
+            value = row.get("value") if isinstance(row, dict) else None
+
+            if not (isinstance(code, str) and code and isinstance(value, str) and value):
+                raise CommandError(f"Row {number}: code and value must be non-empty strings.")
+            if len(code) > code_length or len(value) > value_length:
+                raise CommandError(f"Row {number}: code or value is too long.")
+            if code in seen_codes:
+                raise CommandError(f"Row {number}: duplicate code {code!r}.")
+
+            seen_codes.add(code)
+            batch.append((code, value))
+
+            if len(batch) >= batch_size:
+                total = self.write_batch(version, batch, total, started)
+                batch = []
+
+        if batch:
+            total = self.write_batch(version, batch, total, started)
+
+        return total
+
+    def write_batch(
+        self, version: VersionDirectory, batch: list, total: int, started: float,
+    ) -> int:
+        """ Записывает пакет элементов и возвращает общее число записанных строк """
+        if version.storage == VersionDirectory.STORAGE_SHARED:
+            store_shared_elements(version.id, batch)
+        else:
+            DirectoryElement.objects.bulk_create([
+                DirectoryElement(version_directory_id=version.id, code=code, value=value)
+                for code, value in batch
+            ], batch_size=len(batch))
+
+        total += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{total} rows, {total / elapsed if elapsed else total:.0f} rows/sec"
+        )
+        return total
+
+    @staticmethod
+    def read_rows(path: Path, file_format: str, delimiter: str) -> Iterator[dict]:
+        with path.open(encoding="utf-8-sig", newline="") as file:
+            if file_format == "csv":
+                yield from csv.DictReader(file, delimiter=delimiter)
+
+            elif file_format == "ndjson":
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+
+            else:
+                data = json.load(file)
+                yield from data.get("elements", []) if isinstance(data, dict) else data
@@ -0,0 +1,108 @@
+import copy
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+# Границы корзин гистограммы длительности запроса, в секундах
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+@dataclass
+class RequestMetrics:
+    """ Метрики одного запроса """
+    view: str
+    status: int = 0
+    duration: float = 0.0
+    queries: int = 0
+    db_time: float = 0.0
+    render_time: float = 0.0
+    size: int = 0
+
+
+@dataclass
+class ViewStats:
+    """ Накопленные метрики одного представления """
+    requests: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    buckets: list[int] = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+    duration: float = 0.0
+    queries: int = 0
+    db_time: float = 0.0
+    render_time: float = 0.0
+    size: int = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.requests.values())
+
+
+class MetricsRegistry:
+    """ Агрегирует метрики запросов в памяти процесса и отдаёт их в формате Prometheus """
+    prefix = "service_api"
+
+    def __init__(self):
+        self._views: dict[str, ViewStats] = defaultdict(ViewStats)
+        self._lock = threading.Lock()
+
+    def observe(self, metrics: RequestMetrics) -> None:
+        with self._lock:
+            stats = self._views[metrics.view]
+            stats.requests[metrics.status] += 1
+            stats.duration += metrics.duration
+            stats.queries += metrics.queries
+            stats.db_time += metrics.db_time
+            stats.render_time += metrics.render_time
+            stats.size += metrics.size
+
+            bucket = bisect_left(DURATION_BUCKETS, metrics.duration)
+            if bucket < len(DURATION_BUCKETS):
+                stats.buckets[bucket] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def render(self) -> str:
+        """ Текстовый формат экспозиции Prometheus """
+        with self._lock:
+            views = copy.deepcopy(dict(sorted(self._views.items())))
+
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str) -> str:
+            name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            return name
+
+        name = metric("requests_total", "counter", "Total number of requests.")
+        for view, stats in views.items():
+            for status, count in sorted(stats.requests.items()):
+                lines.append(f'{name}{{view="{view}",status="{status}"}} {count}')
+
+        name = metric("request_duration_seconds", "histogram", "Request duration.")
+        for view, stats in views.items():
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {stats.count}')
+            lines.append(f'{name}_sum{{view="{view}"}} {stats.duration:.6f}')
+            lines.append(f'{name}_count{{view="{view}"}} {stats.count}')
+
+        for suffix, attribute, help_text in (
+            ("db_queries_total", "queries", "Total number of SQL queries."),
+            ("db_duration_seconds_total", "db_time", "Total time spent in SQL."),
+            ("render_duration_seconds_total", "render_time", "Total time spent rendering."),
+            ("response_bytes_total", "size", "Total size of response bodies."),
+        ):
+            name = metric(suffix, "counter", help_text)
+            for view, stats in views.items():
+                value = getattr(stats, attribute)
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f'{name}{{view="{view}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,156 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, HttpRequest, HttpResponseBase
+
+from .metrics import metrics, RequestMetrics
+
+# Метрики текущего запроса. Переменная контекста переносится asgiref
+# в потоки sync_to_async, поэтому запросы async ORM тоже учитываются
+current_metrics: ContextVar[RequestMetrics | None] = ContextVar("current_metrics", default=None)
+
+
+def collect_queries(execute, sql, params, many, context):
+    """ Обёртка выполнения SQL (connection.execute_wrapper), считающая запросы и их время """
+    request_metrics = current_metrics.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.queries += 1
+        request_metrics.db_time += time.perf_counter() - started
+
+
+def install_collector(connection, **kwargs) -> None:
+    """ Подключает обёртку к соединению; соединения свои в каждом потоке """
+    if collect_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(collect_queries)
+
+
+@contextmanager
+def measuring(request_metrics: RequestMetrics):
+    token = current_metrics.set(request_metrics)
+    try:
+        yield
+    finally:
+        current_metrics.reset(token)
+
+
+class QueryMetricsMiddleware:
+    """
+    Собирает по каждому запросу число SQL-запросов, время в базе данных,
+    время сериализации ответа и его размер. Отдаёт их в заголовке Server-Timing
+    и накапливает для endpoint'а /metrics. Работает как под WSGI, так и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        connection_created.connect(install_collector)
+        for connection in connections.all():
+            install_collector(connection)
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics = self.start(request)
+        started = time.perf_counter()
+
+        with measuring(request_metrics):
+            response = self.get_response(request)
+
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        request_metrics = self.start(request)
+        started = time.perf_counter()
+
+        with measuring(request_metrics):
+            response = await self.get_response(request)
+
+        return self.finish(request, response, started)
+
+    @staticmethod
+    def start(request: HttpRequest) -> RequestMetrics:
+        request_metrics = RequestMetrics(view="unmatched")
+        request._request_metrics = request_metrics
+        return request_metrics
+
+    def finish(self, request: HttpRequest, response: HttpResponseBase, started: float) -> HttpResponseBase:
+        request_metrics = request._request_metrics
+        request_metrics.duration = time.perf_counter() - started
+        request_metrics.status = response.status_code
+
+        if request.resolver_match:
+            request_metrics.view = request.resolver_match.view_name
+
+        response.headers["Server-Timing"] = self.server_timing(request_metrics)
+
+        if isinstance(response, FileResponse) and response.file_to_stream is not None:
+            # Файл не оборачивается, чтобы сервер мог отдать его напрямую (wsgi.file_wrapper)
+            request_metrics.size = int(response.headers.get("Content-Length", 0))
+            metrics.observe(request_metrics)
+        elif response.streaming:
+            stream = self.astream if response.is_async else self.stream
+            response.streaming_content = stream(
+                response.streaming_content, request_metrics, started
+            )
+        else:
+            request_metrics.size = len(response.content)
+            metrics.observe(request_metrics)
+
+        return response
+
+    def process_template_response(self, request: HttpRequest, response):
+        """ Засекает время рендеринга ответов DRF (SimpleTemplateResponse) """
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._request_metrics.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def stream(content: Iterator[bytes], request_metrics: RequestMetrics, started: float):
+        """ Продолжает сбор метрик, пока отдаётся потоковый ответ """
+        with measuring(request_metrics):
+            for chunk in content:
+                request_metrics.size += len(chunk)
+                yield chunk
+
+        request_metrics.duration = time.perf_counter() - started
+        metrics.observe(request_metrics)
+
+    @staticmethod
+    async def astream(content: AsyncIterator[bytes], request_metrics: RequestMetrics, started: float):
+        """ Вариант stream для асинхронных потоковых ответов """
+        with measuring(request_metrics):
+            async for chunk in content:
+                request_metrics.size += len(chunk)
+                yield chunk
+
+        request_metrics.duration = time.perf_counter() - started
+        metrics.observe(request_metrics)
+
+    @staticmethod
+    def server_timing(request_metrics: RequestMetrics) -> str:
+        return ", ".join((
+            f'db;dur={request_metrics.db_time * 1000:.2f};desc="{request_metrics.queries} queries"',
+            f"render;dur={request_metrics.render_time * 1000:.2f}",
+            f"total;dur={request_metrics.duration * 1000:.2f}",
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0003_directoryelement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='directory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='versiondirectory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
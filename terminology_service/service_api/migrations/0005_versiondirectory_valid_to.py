@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:06
+
+from django.db import migrations, models
+
+
+def fill_valid_to(apps, schema_editor):
+    VersionDirectory = apps.get_model('service_api', 'VersionDirectory')
+    previous = None
+
+    for version in VersionDirectory.objects.order_by('directory_id', 'created_date'):
+        if previous is not None and previous.directory_id == version.directory_id:
+            previous.valid_to = version.created_date
+            previous.save(update_fields=['valid_to'])
+        previous = version
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0004_directory_updated_at_versiondirectory_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versiondirectory',
+            name='valid_to',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Дата окончания действия версии'),
+        ),
+        migrations.AddIndex(
+            model_name='versiondirectory',
+            index=models.Index(fields=['directory', 'created_date', 'valid_to'], name='version_interval_idx'),
+        ),
+        migrations.RunPython(fill_valid_to, migrations.RunPython.noop),
+    ]
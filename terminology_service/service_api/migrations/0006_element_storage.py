@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0005_versiondirectory_valid_to'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versiondirectory',
+            name='storage',
+            field=models.CharField(choices=[('rows', 'Собственные строки элементов'), ('shared', 'Общие пары код/значение')], default='rows', editable=False, max_length=10, verbose_name='Хранение элементов'),
+        ),
+        migrations.CreateModel(
+            name='ElementValue',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('code', models.CharField(max_length=100, verbose_name='Код элемента')),
+                ('value', models.CharField(max_length=300, verbose_name='Значение элемента')),
+            ],
+            options={
+                'verbose_name': 'Общий элемент справочника',
+                'verbose_name_plural': 'Общие элементы справочников',
+                'constraints': [models.UniqueConstraint(fields=('code', 'value'), name='element_value_constraint')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VersionElement',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('element', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='versions', to='service_api.elementvalue', verbose_name='Идентификатор общего элемента')),
+                ('version_directory', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='shared_elements', to='service_api.versiondirectory', verbose_name='Идентификатор Версии справочника')),
+            ],
+            options={
+                'verbose_name': 'Элемент версии справочника',
+                'verbose_name_plural': 'Элементы версий справочника',
+                'constraints': [models.UniqueConstraint(fields=('version_directory', 'element'), name='version_element_constraint')],
+            },
+        ),
+    ]
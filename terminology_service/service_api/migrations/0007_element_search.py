@@ -0,0 +1,93 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:40
+
+from django.db import migrations
+
+# Полнотекстовые индексы SQLite (FTS5) поверх таблиц элементов. Индексы
+# поддерживаются триггерами, так как элементы загружаются через bulk_create
+SQLITE_TABLES = {
+    'service_api_directoryelement': ('code', 'value', 'version_directory_id'),
+    'service_api_elementvalue': ('code', 'value'),
+}
+
+# Индексы PostgreSQL: триграммы для поиска по подстроке и префиксу, tsvector для слов
+POSTGRES_INDEXES = {
+    'service_api_directoryelement': 'directoryelement',
+    'service_api_elementvalue': 'elementvalue',
+}
+
+
+def sqlite_has_fts5(schema_editor) -> bool:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite' and sqlite_has_fts5(schema_editor):
+        for table, columns in SQLITE_TABLES.items():
+            fts = f'{table}_fts'
+            names = ', '.join(columns)
+            new = ', '.join(f'new.{column}' for column in columns)
+            old = ', '.join(f'old.{column}' for column in columns)
+
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', "
+                f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_update AFTER UPDATE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+                f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+            )
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        for table, name in POSTGRES_INDEXES.items():
+            schema_editor.execute(
+                f"CREATE INDEX {name}_code_trgm ON {table} USING gin (code gin_trgm_ops)"
+            )
+            schema_editor.execute(
+                f"CREATE INDEX {name}_value_trgm ON {table} USING gin (value gin_trgm_ops)"
+            )
+            schema_editor.execute(
+                f"CREATE INDEX {name}_value_tsv ON {table} "
+                f"USING gin (to_tsvector('simple', value))"
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        for table in SQLITE_TABLES:
+            for suffix in ('insert', 'delete', 'update'):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+    elif vendor == 'postgresql':
+        for name in POSTGRES_INDEXES.values():
+            for suffix in ('code_trgm', 'value_trgm', 'value_tsv'):
+                schema_editor.execute(f"DROP INDEX IF EXISTS {name}_{suffix}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0006_element_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
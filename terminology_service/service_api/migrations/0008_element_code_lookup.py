@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0007_element_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='directoryelement',
+            index=models.Index(fields=['code'], name='element_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='versionelement',
+            index=models.Index(fields=['element'], name='version_element_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0008_element_code_lookup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiKey',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('name', models.CharField(max_length=100, verbose_name='Наименование')),
+                ('prefix', models.CharField(editable=False, max_length=8, verbose_name='Начало ключа')),
+                ('digest', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Хэш ключа')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активен')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_keys', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ключ API',
+                'verbose_name_plural': 'Ключи API',
+            },
+        ),
+    ]
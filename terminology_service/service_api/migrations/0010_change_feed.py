@@ -0,0 +1,72 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+ELEMENT_TABLE = 'service_api_directoryelement'
+# Столбцы индекса FTS5 таблицы элементов (см. 0007_element_search)
+FTS_COLUMNS = ('code', 'value', 'version_directory_id')
+
+
+def restore_search_triggers(apps, schema_editor):
+    """
+    SQLite добавляет столбец с датой изменения пересозданием таблицы элементов,
+    при этом удаляются триггеры индекса FTS5 - они создаются заново
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [f'{ELEMENT_TABLE}_fts'],
+        )
+        if cursor.fetchone() is None:
+            return
+
+    fts = f'{ELEMENT_TABLE}_fts'
+    names = ', '.join(FTS_COLUMNS)
+    new = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+    for suffix in ('insert', 'delete', 'update'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+
+    schema_editor.execute(
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {ELEMENT_TABLE} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {ELEMENT_TABLE} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE ON {ELEMENT_TABLE} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0009_apikey'),
+    ]
+
+    operations = [
+        # При откате удаление столбца также пересоздаёт таблицу
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='directoryelement',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='directory',
+            index=models.Index(fields=['updated_at'], name='directory_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='versiondirectory',
+            index=models.Index(fields=['updated_at'], name='version_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_api', '0010_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryTombstone',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False, verbose_name='Идентификатор')),
+                ('directory_id', models.IntegerField(verbose_name='Идентификатор справочника')),
+                ('code', models.CharField(max_length=100, verbose_name='Код')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удалённый справочник',
+                'verbose_name_plural': 'Удалённые справочники',
+                'indexes': [models.Index(fields=['deleted_at'], name='tombstone_deleted_idx')],
+            },
+        ),
+    ]
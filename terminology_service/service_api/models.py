@@ -1,3 +1,8 @@
+import hashlib
+import secrets
+from datetime import date
+
+from django.conf import settings
 from django.utils import timezone
 from django.db import models
 
@@ -7,6 +12,10 @@ class Directory(models.Model):
     class Meta:
         verbose_name = 'Справочник'
         verbose_name_plural = 'Справочники'
+        indexes = [
+            # Лента изменений справочников (/refbooks/changes)
+            models.Index(name="directory_updated_idx", fields=['updated_at']),
+        ]
 
     id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
     code = models.CharField(
@@ -16,13 +25,40 @@ class Directory(models.Model):
         max_length=300, null=False, blank=False, verbose_name="Наименование"
     )
     description = models.TextField(verbose_name="Описание")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     def __str__(self) -> str:
         return f"Справочник: #{self.pk}"
 
 
+class DirectoryTombstone(models.Model):
+    """ Модель для описания таблицы удалённых справочников (для ленты изменений) """
+    class Meta:
+        verbose_name = 'Удалённый справочник'
+        verbose_name_plural = 'Удалённые справочники'
+        indexes = [
+            models.Index(name="tombstone_deleted_idx", fields=['deleted_at']),
+        ]
+
+    id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
+    directory_id = models.IntegerField(verbose_name="Идентификатор справочника")
+    code = models.CharField(max_length=100, verbose_name="Код")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата удаления")
+
+    def __str__(self) -> str:
+        return f"Удалённый справочник: #{self.directory_id}"
+
+
 class VersionDirectory(models.Model):
     """ Модель для описания таблицы версий справочника """
+    # Способы хранения элементов версии
+    STORAGE_ROWS = "rows"
+    STORAGE_SHARED = "shared"
+    STORAGE_CHOICES = [
+        (STORAGE_ROWS, "Собственные строки элементов"),
+        (STORAGE_SHARED, "Общие пары код/значение"),
+    ]
+
     class Meta:
         verbose_name = 'Версия справочника'
         verbose_name_plural = 'Версии справочника'
@@ -34,6 +70,14 @@ class VersionDirectory(models.Model):
                 name="date_constraint", fields=['directory', 'created_date'],
             )
         ]
+        indexes = [
+            models.Index(
+                name="version_interval_idx",
+                fields=['directory', 'created_date', 'valid_to'],
+            ),
+            # Лента изменений справочников (/refbooks/changes)
+            models.Index(name="version_updated_idx", fields=['updated_at']),
+        ]
 
     id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
     directory = models.ForeignKey(
@@ -51,10 +95,53 @@ class VersionDirectory(models.Model):
         db_index=True,
         verbose_name="Дата начала действия версии",
     )
+    valid_to = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Дата окончания действия версии",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+    storage = models.CharField(
+        max_length=10,
+        choices=STORAGE_CHOICES,
+        default=STORAGE_ROWS,
+        editable=False,
+        verbose_name="Хранение элементов",
+    )
 
     def __str__(self) -> str:
         return f"Номер версии справочника: #{self.pk}"
 
+    @classmethod
+    def active_on(cls, on_date: date) -> models.Q:
+        """ Условие выборки версий, действующих на указанную дату """
+        return models.Q(created_date__lte=on_date) & (
+            models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=on_date)
+        )
+
+    @classmethod
+    def refresh_intervals(cls, directory_id: int) -> None:
+        """
+        Пересчитывает даты окончания действия версий справочника:
+        версия действует до даты начала следующей за ней версии
+        """
+        versions = list(
+            cls.objects.filter(directory_id=directory_id)
+            .order_by("created_date")
+            .only("id", "created_date", "valid_to")
+        )
+        changed = []
+
+        for current, following in zip(versions, versions[1:] + [None]):
+            valid_to = following.created_date if following else None
+
+            if current.valid_to != valid_to:
+                current.valid_to = valid_to
+                changed.append(current)
+
+        cls.objects.bulk_update(changed, ["valid_to"])
+
 
 class DirectoryElement(models.Model):
     """ Модель для описания таблицы элементов справочника """
@@ -66,6 +153,10 @@ class DirectoryElement(models.Model):
                 name="code_constraint", fields=['version_directory', 'code'],
             ),
         ]
+        indexes = [
+            # Поиск справочников, содержащих код (/elements/lookup)
+            models.Index(name="element_code_idx", fields=['code']),
+        ]
 
     id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
     version_directory = models.ForeignKey(
@@ -80,6 +171,115 @@ class DirectoryElement(models.Model):
     value = models.CharField(
         max_length=300, null=False, blank=False, verbose_name="Значение элемента",
     )
+    # Без индекса: лента изменений читает дату изменения версии, которую
+    # обновляет любое изменение её элементов
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     def __str__(self) -> str:
         return f"Номер элемента справочника: #{self.pk}"
+
+
+class ElementValue(models.Model):
+    """
+    Модель для описания таблицы пар код/значение, общих для версий справочников.
+    Каждая пара хранится один раз, версии ссылаются на неё через VersionElement
+    """
+    class Meta:
+        verbose_name = 'Общий элемент справочника'
+        verbose_name_plural = 'Общие элементы справочников'
+        constraints = [
+            models.UniqueConstraint(
+                name="element_value_constraint", fields=['code', 'value'],
+            ),
+        ]
+
+    id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
+    code = models.CharField(
+        max_length=100, null=False, blank=False, verbose_name="Код элемента",
+    )
+    value = models.CharField(
+        max_length=300, null=False, blank=False, verbose_name="Значение элемента",
+    )
+
+    def __str__(self) -> str:
+        return f"Общий элемент справочника: #{self.pk}"
+
+
+class VersionElement(models.Model):
+    """ Модель для описания таблицы принадлежности общих элементов версиям справочника """
+    class Meta:
+        verbose_name = 'Элемент версии справочника'
+        verbose_name_plural = 'Элементы версий справочника'
+        constraints = [
+            models.UniqueConstraint(
+                name="version_element_constraint", fields=['version_directory', 'element'],
+            ),
+        ]
+        indexes = [
+            # Версии, в которые входит общий элемент (/elements/lookup)
+            models.Index(name="version_element_idx", fields=['element']),
+        ]
+
+    id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
+    # Отдельные индексы внешних ключей не создаются: выборки по версии
+    # обслуживает уникальный индекс (версия, элемент), по элементу - version_element_idx
+    version_directory = models.ForeignKey(
+        VersionDirectory,
+        on_delete=models.PROTECT,
+        db_index=False,
+        related_name="shared_elements",
+        verbose_name="Идентификатор Версии справочника",
+    )
+    element = models.ForeignKey(
+        ElementValue,
+        on_delete=models.PROTECT,
+        db_index=False,
+        related_name="versions",
+        verbose_name="Идентификатор общего элемента",
+    )
+
+    def __str__(self) -> str:
+        return f"Элемент версии справочника: #{self.pk}"
+
+
+class ApiKey(models.Model):
+    """
+    Модель для описания таблицы ключей доступа к API. Хранится только хэш ключа:
+    ключ случаен и длинен, поэтому достаточно быстрого SHA-256 вместо PBKDF2
+    """
+    class Meta:
+        verbose_name = 'Ключ API'
+        verbose_name_plural = 'Ключи API'
+
+    id = models.AutoField(primary_key=True, verbose_name='Идентификатор')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="api_keys",
+        verbose_name="Пользователь",
+    )
+    name = models.CharField(
+        max_length=100, null=False, blank=False, verbose_name="Наименование",
+    )
+    prefix = models.CharField(
+        max_length=8, editable=False, verbose_name="Начало ключа",
+    )
+    digest = models.CharField(
+        max_length=64, unique=True, editable=False, verbose_name="Хэш ключа",
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Активен")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    def __str__(self) -> str:
+        return f"Ключ API: {self.prefix}..."
+
+    @staticmethod
+    def hash_key(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def generate_key(self) -> str:
+        """ Создаёт новый ключ, сохраняет его хэш и возвращает ключ (показывается один раз) """
+        key = secrets.token_urlsafe(32)
+        self.prefix = key[:8]
+        self.digest = self.hash_key(key)
+        return key
@@ -0,0 +1,76 @@
+from typing import Callable
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Постраничная выдача по ключу (keyset): следующая страница выбирается
+    условием по индексированному полю, а не через OFFSET. Включается только
+    если клиент передал cursor или page_size.
+    """
+    page_size = settings.KEYSET_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.KEYSET_MAX_PAGE_SIZE
+    results_key = "results"
+
+    def is_requested(self, request: Request) -> bool:
+        return self.cursor_query_param in request.query_params \
+            or self.page_size_query_param in request.query_params
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            self.results_key: data,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+        })
+
+
+class DirectoryPagination(KeysetPagination):
+    """ Постраничная выдача справочников по идентификатору """
+    ordering = "id"
+    results_key = "refbooks"
+
+
+class DirectoryElementPagination(KeysetPagination):
+    """ Постраничная выдача элементов версии справочника по коду элемента """
+    ordering = "code"
+    results_key = "elements"
+
+
+class SearchPagination(LimitOffsetPagination):
+    """
+    Постраничная выдача результатов поиска в порядке ранжирования (limit/offset).
+    Общее число результатов не считается: запрашивается на одну запись больше
+    """
+    default_limit = settings.SEARCH_PAGE_SIZE
+    max_limit = settings.SEARCH_MAX_PAGE_SIZE
+    results_key = "elements"
+
+    def paginate_search(self, search: Callable[[int, int], list], request: Request) -> list:
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+
+        rows = search(self.limit + 1, self.offset)
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            self.results_key: data,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+        })
@@ -0,0 +1,127 @@
+import json
+from itertools import islice
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Row = tuple[str, str]
+
+# Даты и время в UTC как у JSONEncoder DRF: "...Z" вместо "...+00:00"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z if orjson is not None else 0
+
+
+def dumps(data) -> bytes:
+    """
+    Компактная сериализация в JSON, совпадающая с выводом JSONRenderer.
+    Использует orjson, если он установлен
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=ORJSON_OPTIONS)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _element(row: Row) -> dict:
+    code, value = row
+    return {"code": code, "value": value}
+
+
+def _chunks(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+async def _achunks(rows: AsyncIterable[Row], size: int) -> AsyncIterator[list[Row]]:
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _json_chunk(chunk: list[Row]) -> bytes:
+    # Порция сериализуется одним вызовом, квадратные скобки списка отбрасываются
+    return dumps([_element(row) for row in chunk])[1:-1]
+
+
+def _ndjson_chunk(chunk: list[Row]) -> bytes:
+    return b"".join(dumps(_element(row)) + b"\n" for row in chunk)
+
+
+def stream_json(rows: Iterable[Row], key: str = "elements", chunk_size: int = 2000) -> Iterator[bytes]:
+    """ Потоково формирует ответ вида {"elements": [...]} порциями по chunk_size строк """
+    yield b'{"' + key.encode() + b'":['
+    separator = b""
+
+    for chunk in _chunks(rows, chunk_size):
+        yield separator + _json_chunk(chunk)
+        separator = b","
+
+    yield b"]}"
+
+
+def stream_ndjson(rows: Iterable[Row], chunk_size: int = 2000) -> Iterator[bytes]:
+    """ Потоково формирует ответ в формате NDJSON: по одному элементу на строку """
+    for chunk in _chunks(rows, chunk_size):
+        yield _ndjson_chunk(chunk)
+
+
+async def astream_json(
+    rows: AsyncIterable[Row], key: str = "elements", chunk_size: int = 2000,
+) -> AsyncIterator[bytes]:
+    """ Асинхронный вариант stream_json для строк из aiterator() """
+    yield b'{"' + key.encode() + b'":['
+    separator = b""
+
+    async for chunk in _achunks(rows, chunk_size):
+        yield separator + _json_chunk(chunk)
+        separator = b","
+
+    yield b"]}"
+
+
+async def astream_ndjson(rows: AsyncIterable[Row], chunk_size: int = 2000) -> AsyncIterator[bytes]:
+    """ Асинхронный вариант stream_ndjson для строк из aiterator() """
+    async for chunk in _achunks(rows, chunk_size):
+        yield _ndjson_chunk(chunk)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, сериализующий компактный ответ через orjson (если установлен).
+    Ответы с отступами и неподдерживаемыми типами отдаются стандартному рендереру
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            return orjson.dumps(data, option=ORJSON_OPTIONS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """ Рендерер NDJSON: каждый элемент списка "elements" выводится отдельной строкой """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+        if isinstance(data, dict) and isinstance(data.get("elements"), list):
+            return b"".join(dumps(item) + b"\n" for item in data["elements"])
+        return dumps(data) + b"\n"
@@ -0,0 +1,93 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import FileResponse, HttpResponseBase
+
+# Чтения текущего запроса можно направлять на реплики. Включается только
+# представлениями API, админка и команды всегда работают с основной базой
+replica_reads_enabled: ContextVar[bool] = ContextVar("replica_reads_enabled", default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = replica_reads_enabled.set(True)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+
+def _stream(content: Iterator[bytes]) -> Iterator[bytes]:
+    with replica_reads():
+        yield from content
+
+
+async def _astream(content: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    with replica_reads():
+        async for chunk in content:
+            yield chunk
+
+
+def keep_replica_reads(response: HttpResponseBase) -> HttpResponseBase:
+    """
+    Потоковый ответ читает данные после выхода из представления - тоже с реплик.
+    Ответ из файла к базе данных не обращается и не оборачивается
+    """
+    if isinstance(response, FileResponse) and response.file_to_stream is not None:
+        return response
+    if response.streaming:
+        stream = _astream if response.is_async else _stream
+        response.streaming_content = stream(response.streaming_content)
+    return response
+
+
+class ReplicaRouter:
+    """
+    Направляет чтения моделей service_api из представлений API на реплики
+    по кругу. В течение DATABASE_REPLICA_LAG секунд после записи (например,
+    из админки) чтения идут в основную базу, пока реплики догоняют её.
+    Отметка записи хранится в кэше Django DATABASE_REPLICA_CACHE: окно действует
+    во всех процессах, если этот кэш у них общий, иначе - только в процессе записи
+    """
+    app_label = "service_api"
+    written_key = "service_api:replica_router:written"
+
+    def __init__(
+        self,
+        replicas: list[str] | None = None,
+        lag: float | None = None,
+        cache_alias: str | None = None,
+    ):
+        self.replicas = settings.DATABASE_REPLICAS if replicas is None else replicas
+        self.lag = settings.DATABASE_REPLICA_LAG if lag is None else lag
+        self.cache_alias = settings.DATABASE_REPLICA_CACHE if cache_alias is None else cache_alias
+        self._replicas = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+        self._written_at = float("-inf")
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if not self.replicas or model._meta.app_label != self.app_label:
+            return None
+        if not replica_reads_enabled.get() or self.recently_written():
+            return None
+
+        with self._lock:
+            return next(self._replicas)
+
+    def db_for_write(self, model, **hints) -> str | None:
+        if model._meta.app_label == self.app_label and self.replicas:
+            self._written_at = time.monotonic()
+            caches[self.cache_alias].set(self.written_key, True, timeout=self.lag)
+        return None
+
+    def recently_written(self) -> bool:
+        # Собственная запись процесса проверяется без обращения к кэшу
+        if time.monotonic() - self._written_at < self.lag:
+            return True
+        return caches[self.cache_alias].get(self.written_key, False)
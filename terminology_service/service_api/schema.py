@@ -0,0 +1,107 @@
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBase
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .conditional import not_modified_response, set_validators
+
+# Форматы файлов схемы OpenAPI -> рендерер
+FORMATS = {"yaml": OpenApiYamlRenderer, "json": OpenApiJsonRenderer}
+
+
+def schema_path(file_format: str) -> Path:
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"schema.{file_format}"
+
+
+def build_schema() -> list[Path]:
+    """
+    Формирует схему OpenAPI по текущим маршрутам и документации представлений
+    и записывает её во всех форматах. Файлы заменяются атомарно
+    """
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    paths = []
+
+    for file_format, renderer_class in FORMATS.items():
+        path = schema_path(file_format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=".schema-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(renderer_class().render(schema, renderer_context={}))
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+        paths.append(path)
+
+    return paths
+
+
+@lru_cache(maxsize=len(FORMATS))
+def _read(path: Path, mtime_ns: int) -> tuple[bytes, str]:
+    content = path.read_bytes()
+    return content, f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def load_schema(file_format: str) -> tuple[bytes, str] | None:
+    """ Содержимое файла схемы и его ETag (кэшируются до изменения файла), либо None """
+    path = schema_path(file_format)
+    try:
+        return _read(path, path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+class ApiKeyAuthenticationScheme(OpenApiAuthenticationExtension):
+    """ Описание аутентификации по ключу API в схеме """
+    target_class = "service_api.authentication.ApiKeyAuthentication"
+    name = "ApiKeyAuth"
+
+    def get_security_definition(self, auto_schema):
+        return {
+            "type": "apiKey",
+            "in": "header",
+            "name": "Authorization",
+            "description": "Value: `Api-Key <key>`",
+        }
+
+
+class StaticSchemaView(SpectacularAPIView):
+    """
+    Endpoint for the OpenAPI schema pre-generated by the build_schema command.
+    The schema is generated on each request only in DEBUG when the file is missing
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        file_format = request.accepted_renderer.format
+        loaded = load_schema(file_format) if file_format in FORMATS else None
+
+        if loaded is None:
+            if settings.DEBUG:
+                return super().get(request, *args, **kwargs)
+            return Response(
+                {"error": "OpenAPI schema is not built, run the build_schema command"}, 404,
+            )
+
+        content, etag = loaded
+
+        not_modified = not_modified_response(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(content, content_type=request.accepted_renderer.media_type)
+        return set_validators(response, etag, None)
@@ -0,0 +1,141 @@
+import re
+from functools import cache
+
+from django.db import connection, connections, router
+from django.db.models import Q
+
+from .models import DirectoryElement, ElementValue, VersionDirectory, VersionElement
+from .services import version_elements, version_storage
+
+Row = dict[str, str]
+
+
+def query_terms(query: str) -> list[str]:
+    """
+    Слова запроса по группам: "A01.00 acute" -> ["A01 00", "acute"].
+    Слова одной группы ищутся подряд, последняя группа - как префикс
+    """
+    terms = (" ".join(re.findall(r"\w+", chunk)) for chunk in query.split())
+    return [term for term in terms if term]
+
+
+def _is_shared(version_id: int) -> bool:
+    return version_storage(version_id) == VersionDirectory.STORAGE_SHARED
+
+
+def _source(version_id: int) -> tuple[str, str, list]:
+    """ Таблица элементов версии с учётом способа хранения: (FROM, WHERE, параметры) """
+    quote = connection.ops.quote_name
+
+    if _is_shared(version_id):
+        return (
+            f"{quote(ElementValue._meta.db_table)} e "
+            f"JOIN {quote(VersionElement._meta.db_table)} m ON m.element_id = e.id",
+            "m.version_directory_id = %s",
+            [version_id],
+        )
+
+    return (
+        f"{quote(DirectoryElement._meta.db_table)} e",
+        "e.version_directory_id = %s",
+        [version_id],
+    )
+
+
+def _fetch(sql: str, params: list) -> list[Row]:
+    # Чтение элементов, как и запросы ORM, направляется на реплику (ReplicaRouter)
+    with connections[router.db_for_read(DirectoryElement)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [{"code": code, "value": value} for code, value in cursor.fetchall()]
+
+
+class SearchBackend:
+    """
+    Поиск элементов без специального индекса: префикс кода или подстрока
+    значения. Используется, если база данных не поддерживает полнотекстовый поиск
+    """
+
+    def search(self, version_id: int, query: str, limit: int, offset: int) -> list[Row]:
+        condition = Q(code__istartswith=query) | Q(value__icontains=query)
+        rows = version_elements(version_id).filter(condition) \
+            .order_by("code").values("code", "value")
+        return list(rows[offset:offset + limit])
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Поиск по полнотекстовому индексу FTS5 (см. миграцию 0007_element_search)
+    с ранжированием по bm25: совпадения в коде весят больше, чем в значении
+    """
+
+    def search(self, version_id: int, query: str, limit: int, offset: int) -> list[Row]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        source, condition, params = _source(version_id)
+        shared = _is_shared(version_id)
+        table = ElementValue._meta.db_table if shared else DirectoryElement._meta.db_table
+        fts = connection.ops.quote_name(f"{table}_fts")
+
+        match = "{code value} : (%s)" % " ".join(f'"{term}"*' for term in terms)
+        if not shared:
+            # Отбор по версии внутри индекса: ранжируются только элементы версии
+            match = f'version_directory_id : "{version_id}" AND {match}'
+
+        return _fetch(
+            f"SELECT e.code, e.value FROM {source} JOIN {fts} ON {fts}.rowid = e.id "
+            f"WHERE {fts} MATCH %s AND {condition} "
+            f"ORDER BY e.code = %s DESC, bm25({fts}, 10.0, 1.0), e.code "
+            f"LIMIT %s OFFSET %s",
+            [match, *params, query, limit, offset],
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Поиск по триграммным (pg_trgm) индексам кода и значения и по индексу
+    tsvector значения с ранжированием по сходству строк
+    """
+
+    def search(self, version_id: int, query: str, limit: int, offset: int) -> list[Row]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        source, condition, params = _source(version_id)
+        tsquery = " & ".join(f"{word}:*" for term in terms for word in term.split())
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+        return _fetch(
+            f"SELECT e.code, e.value FROM {source} "
+            f"WHERE {condition} AND (e.code ILIKE %s OR e.value ILIKE %s "
+            f"OR to_tsvector('simple', e.value) @@ to_tsquery('simple', %s)) "
+            f"ORDER BY e.code = %s DESC, e.code ILIKE %s DESC, "
+            f"greatest(similarity(e.code, %s), similarity(e.value, %s)) DESC, e.code "
+            f"LIMIT %s OFFSET %s",
+            [
+                *params, f"{pattern}%", f"%{pattern}%", tsquery,
+                query, f"{pattern}%", query, query, limit, offset,
+            ],
+        )
+
+
+@cache
+def search_backend() -> SearchBackend:
+    """ Поиск, соответствующий базе данных и созданным для неё индексам """
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+
+    fts = f"{DirectoryElement._meta.db_table}_fts"
+    if connection.vendor == "sqlite" and fts in connection.introspection.table_names():
+        return SQLiteSearchBackend()
+
+    return SearchBackend()
+
+
+def search_elements(version_id: int | None, query: str, limit: int, offset: int) -> list[Row]:
+    """ Ищет элементы версии справочника по префиксу кода и словам значения """
+    if version_id is None or not query.strip():
+        return []
+    return search_backend().search(version_id, query.strip(), limit, offset)
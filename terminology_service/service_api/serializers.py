@@ -1,6 +1,6 @@
-from datetime import datetime
-from sqlite3 import Date
+from datetime import datetime, timedelta, timezone
 
+from django.conf import settings
 from rest_framework import serializers
 
 from .models import Directory, DirectoryElement
@@ -8,13 +8,7 @@ from .models import Directory, DirectoryElement
 
 class DateSerializer(serializers.Serializer):
     """ Схема для валидации даты в строковом виде """
-    date = serializers.SerializerMethodField('get_date')
-
-    @staticmethod
-    def get_date(obj: str):
-        year, month, day = obj.split("-")
-        if datetime(int(year), int(month), int(day)):
-            return Date(year=year, month=month, day=day)
+    date = serializers.DateField()
 
 
 class DirectorySerializer(serializers.ModelSerializer):
@@ -35,4 +29,87 @@ class CheckSerializer(serializers.Serializer):
     """ Схема для валидации входных данных при проверке существования версии """
     code = serializers.CharField()
     value = serializers.CharField()
-    version = serializers.CharField()
+    version = serializers.CharField(required=False)
+
+
+class LookupSerializer(serializers.Serializer):
+    """ Схема для валидации входных данных при поиске справочников по коду элемента """
+    code = serializers.CharField()
+    date = serializers.DateField(required=False)
+
+
+class CursorField(serializers.IntegerField):
+    """ Курсор ленты изменений: время изменения в микросекундах от начала эпохи (UTC) """
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def to_internal_value(self, data) -> datetime:
+        microseconds = super().to_internal_value(data)
+        if microseconds < 0:
+            self.fail("min_value", min_value=0)
+
+        try:
+            return self.epoch + timedelta(microseconds=microseconds)
+        except OverflowError:
+            self.fail("invalid")
+
+    def to_representation(self, value: datetime | None) -> int:
+        if value is None:
+            return 0
+        return (value - self.epoch) // timedelta(microseconds=1)
+
+
+class ChangesSerializer(serializers.Serializer):
+    """ Схема для валидации курсора ленты изменений справочников """
+    since = CursorField(required=False)
+
+
+class DiffSerializer(serializers.Serializer):
+    """ Схема для валидации версий при сравнении справочника """
+    to = serializers.CharField()
+
+    def get_fields(self):
+        # "from" - зарезервированное слово, поэтому поле объявляется здесь
+        return {"from": serializers.CharField(), **super().get_fields()}
+
+
+class ElementPairsField(serializers.Field):
+    """
+    Поле со списком пар {"code": ..., "value": ...}. Проверяется одним
+    проходом без вложенных сериализаторов, так как пар могут быть тысячи.
+    """
+    default_error_messages = {
+        "not_a_list": "Expected a list of items.",
+        "invalid_item": "Item #{index} must contain non-empty string code and value.",
+        "max_length": "Ensure this field has no more than {max_length} items.",
+    }
+
+    def __init__(self, max_length: int | None = None, **kwargs):
+        self.max_length = max_length
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data) -> list[tuple[str, str]]:
+        if not isinstance(data, list):
+            self.fail("not_a_list")
+        if self.max_length is not None and len(data) > self.max_length:
+            self.fail("max_length", max_length=self.max_length)
+
+        pairs = []
+        for index, item in enumerate(data):
+            code = item.get("code") if isinstance(item, dict) else None
+            value = item.get("value") if isinstance(item, dict) else None
+
+            if not (isinstance(code, str) and code and isinstance(value, str) and value):
+                self.fail("invalid_item", index=index)
+
+            pairs.append((code, value))
+
+        return pairs
+
+    def to_representation(self, value):
+        return [{"code": code, "value": value} for code, value in value]
+
+
+class BulkCheckSerializer(serializers.Serializer):
+    """ Схема для валидации входных данных при пакетной проверке элементов """
+    version = serializers.CharField(required=False)
+    elements = ElementPairsField(max_length=settings.BULK_CHECK_MAX_ITEMS)
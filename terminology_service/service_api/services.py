@@ -0,0 +1,383 @@
+from datetime import date, datetime, timedelta
+from typing import Iterator, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Exists, Max, OuterRef, QuerySet, Subquery
+from django.utils import timezone
+
+from .cache import LocalCache
+from .index import LocalMembershipIndex, create_membership_index
+from .models import (
+    Directory,
+    DirectoryElement,
+    DirectoryTombstone,
+    ElementValue,
+    VersionDirectory,
+    VersionElement,
+)
+
+version_cache = LocalCache(
+    max_size=settings.VERSION_CACHE_SIZE, ttl=settings.VERSION_CACHE_TTL,
+)
+_missing = object()
+
+
+class ResolvedVersion(NamedTuple):
+    """ Версия справочника, к которой относится запрос """
+    id: int
+    updated_at: datetime
+
+
+def _version_key(directory_id: int, version: str | None, on_date: date | None) -> tuple:
+    if version:
+        return directory_id, "version", version
+    return directory_id, "date", on_date or date.today()
+
+
+def _version_query(key: tuple) -> QuerySet:
+    directory_id, kind, value = key
+    query = VersionDirectory.objects.filter(directory_id=directory_id)
+
+    if kind == "version":
+        query = query.filter(version=value)
+    else:
+        query = query.filter(VersionDirectory.active_on(value))
+
+    return query.values_list("id", "updated_at", "storage")
+
+
+def _resolved(row: tuple | None) -> ResolvedVersion | None:
+    if row is None:
+        return None
+
+    version_id, updated_at, storage = row
+    version_cache.set(("storage", version_id), storage)
+    return ResolvedVersion(version_id, updated_at)
+
+
+def resolve_version(
+    directory_id: int, version: str | None = None, on_date: date | None = None,
+) -> ResolvedVersion | None:
+    """
+    Возвращает указанную версию справочника, либо версию, действующую на дату
+    (по умолчанию - на сегодня). Результат кэшируется.
+    """
+    key = _version_key(directory_id, version, on_date)
+    resolved = version_cache.get(key, _missing)
+
+    if resolved is _missing:
+        resolved = _resolved(_version_query(key).first())
+        version_cache.set(key, resolved)
+
+    return resolved
+
+
+async def aresolve_version(
+    directory_id: int, version: str | None = None, on_date: date | None = None,
+) -> ResolvedVersion | None:
+    """ Асинхронный вариант resolve_version на async ORM, с тем же кэшем """
+    key = _version_key(directory_id, version, on_date)
+    resolved = version_cache.get(key, _missing)
+
+    if resolved is _missing:
+        resolved = _resolved(await _version_query(key).afirst())
+        version_cache.set(key, resolved)
+
+    return resolved
+
+
+def resolve_version_id(
+    directory_id: int, version: str | None = None, on_date: date | None = None,
+) -> int | None:
+    """ Возвращает идентификатор версии справочника, см. resolve_version """
+    resolved = resolve_version(directory_id, version, on_date)
+    return resolved.id if resolved else None
+
+
+def directories_state() -> tuple[tuple, datetime | None]:
+    """
+    Состояние списка справочников для условных запросов:
+    части ETag и дата последнего изменения
+    """
+    directories = Directory.objects.aggregate(count=Count("id"), updated_at=Max("updated_at"))
+    versions = VersionDirectory.objects.aggregate(count=Count("id"), updated_at=Max("updated_at"))
+
+    last_modified = max(
+        (item["updated_at"] for item in (directories, versions) if item["updated_at"]),
+        default=None,
+    )
+    return (directories["count"], versions["count"], last_modified), last_modified
+
+
+def touch_version(version_id: int) -> None:
+    """ Отмечает изменение содержимого версии справочника """
+    touch_versions({version_id})
+
+
+def touch_versions(version_ids: set[int]) -> None:
+    """ Отмечает изменение содержимого версий справочников одним запросом """
+    VersionDirectory.objects.filter(pk__in=version_ids).update(updated_at=timezone.now())
+    version_cache.clear()
+
+
+def touch_directories(directory_ids: set[int]) -> None:
+    """
+    Отмечает изменение справочников при изменении состава или периодов действия
+    их версий, чтобы лента изменений сообщила и об удалённых версиях
+    """
+    Directory.objects.filter(pk__in=directory_ids).update(updated_at=timezone.now())
+
+
+def _storage_query(version_id: int) -> QuerySet:
+    return VersionDirectory.objects.filter(pk=version_id).values_list("storage", flat=True)
+
+
+def version_storage(version_id: int) -> str | None:
+    """ Способ хранения элементов версии справочника (кэшируется вместе с версиями) """
+    key = ("storage", version_id)
+    storage = version_cache.get(key, _missing)
+
+    if storage is _missing:
+        storage = _storage_query(version_id).first()
+        version_cache.set(key, storage)
+
+    return storage
+
+
+def _elements(version_id: int, storage: str | None) -> QuerySet:
+    if storage == VersionDirectory.STORAGE_SHARED:
+        # Порядок добавления в версию, как у собственных строк элементов
+        return ElementValue.objects.filter(versions__version_directory_id=version_id) \
+            .order_by("versions__id")
+    return DirectoryElement.objects.filter(version_directory_id=version_id)
+
+
+def version_elements(version_id: int | None) -> QuerySet:
+    """
+    Возвращает элементы версии справочника. Независимо от способа хранения
+    у элементов есть поля code и value
+    """
+    if version_id is None:
+        return DirectoryElement.objects.none()
+    return _elements(version_id, version_storage(version_id))
+
+
+async def aversion_elements(version_id: int | None) -> QuerySet:
+    """ Асинхронный вариант version_elements """
+    if version_id is None:
+        return DirectoryElement.objects.none()
+
+    key = ("storage", version_id)
+    storage = version_cache.get(key, _missing)
+
+    if storage is _missing:
+        storage = await _storage_query(version_id).afirst()
+        version_cache.set(key, storage)
+
+    return _elements(version_id, storage)
+
+
+def store_shared_elements(version_id: int, pairs: list[tuple[str, str]]) -> None:
+    """
+    Записывает пакет элементов версии в общем хранилище: новые пары код/значение
+    добавляются один раз, версия ссылается на уже существующие
+    """
+    codes = sorted({code for code, _ in pairs})
+    size = connection.features.max_query_params or len(codes) or 1
+    ids = {}
+
+    for index in range(0, len(codes), size):
+        rows = ElementValue.objects.filter(code__in=codes[index:index + size]) \
+            .values_list("code", "value", "id")
+        ids.update(((code, value), element_id) for code, value, element_id in rows)
+
+    created = ElementValue.objects.bulk_create(
+        [ElementValue(code=code, value=value) for code, value in pairs if (code, value) not in ids]
+    )
+    ids.update(((element.code, element.value), element.pk) for element in created)
+
+    # Строки принадлежности - пары чисел, их вставка без создания объектов моделей
+    # быстрее bulk_create в несколько раз
+    quote = connection.ops.quote_name
+    meta = VersionElement._meta
+    sql = "INSERT INTO {} ({}, {}) VALUES (%s, %s)".format(
+        quote(meta.db_table),
+        quote(meta.get_field("version_directory").column),
+        quote(meta.get_field("element").column),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(version_id, ids[pair]) for pair in pairs])
+
+
+def version_pairs(version_id: int) -> Iterator[tuple[str, str]]:
+    """ Потоково выдаёт пары (код, значение) элементов версии справочника """
+    return version_elements(version_id).values_list("code", "value") \
+        .iterator(chunk_size=settings.MEMBERSHIP_INDEX_CHUNK_SIZE)
+
+
+class VersionDiff(NamedTuple):
+    """ Разница между двумя версиями справочника """
+    added: list[dict]
+    removed: list[dict]
+    changed: list[dict]
+
+
+def version_diff(from_id: int, to_id: int) -> VersionDiff:
+    """
+    Сравнивает версии справочника на стороне БД двумя запросами: элементы новой
+    версии с прежним значением по коду (добавленные и изменённые) и элементы
+    старой версии, коды которых в новой отсутствуют (удалённые)
+    """
+    previous = version_elements(from_id).filter(code=OuterRef("code"))
+    current = version_elements(to_id).filter(code=OuterRef("code"))
+
+    added, changed = [], []
+    rows = version_elements(to_id) \
+        .filter(~Exists(previous.filter(value=OuterRef("value")))) \
+        .annotate(previous_value=Subquery(previous.values("value")[:1])) \
+        .order_by("code") \
+        .values_list("code", "value", "previous_value") \
+        .iterator(chunk_size=settings.ELEMENTS_STREAM_CHUNK_SIZE)
+
+    for code, value, previous_value in rows:
+        if previous_value is None:
+            added.append({"code": code, "value": value})
+        else:
+            changed.append({"code": code, "value": value, "previous_value": previous_value})
+
+    removed = version_elements(from_id) \
+        .filter(~Exists(current)) \
+        .order_by("code") \
+        .values("code", "value")
+
+    return VersionDiff(added, list(removed), changed)
+
+
+def lookup_code(code: str, on_date: date | None = None) -> list[dict]:
+    """
+    Справочники, версии которых, действующие на дату (по умолчанию - на сегодня),
+    содержат элемент с кодом. Один запрос: выборки по индексам кода элементов
+    обоих способов хранения, объединённые через UNION ALL
+    """
+    active = VersionDirectory.objects.filter(VersionDirectory.active_on(on_date or date.today()))
+    fields = "directory_id", "directory__code", "directory__name", "version"
+
+    rows = active.filter(elements__code=code) \
+        .values_list(*fields, "elements__value") \
+        .union(
+            active.filter(shared_elements__element__code=code)
+            .values_list(*fields, "shared_elements__element__value"),
+            all=True,
+        ) \
+        .order_by("directory_id")
+
+    return [
+        {"id": directory_id, "code": directory_code, "name": name,
+         "version": version, "value": value}
+        for directory_id, directory_code, name, version, value in rows
+    ]
+
+
+class Changes(NamedTuple):
+    """ Изменения справочников после курсора ленты изменений """
+    refbooks: list[dict]
+    deleted: list[int]
+    cursor: datetime | None
+
+
+def changes_since(since: datetime | None = None) -> Changes:
+    """
+    Справочники, изменённые после момента since (сами, их версии или элементы
+    версий), со всеми их версиями, и идентификаторы удалённых справочников.
+    Без изменений выполняется один запрос по индексам дат изменения.
+
+    Дата изменения ставится до фиксации транзакции, поэтому курсор отстаёт
+    от текущего времени на CHANGES_SAFETY_WINDOW: изменения последних секунд
+    отправляются повторно, и транзакция, зафиксированная позже опроса, не теряется
+    """
+    directories = Directory.objects.values_list("id", "updated_at")
+    versions = VersionDirectory.objects.values_list("directory_id", "updated_at")
+    tombstones = DirectoryTombstone.objects.values_list("directory_id", "deleted_at")
+
+    if since is not None:
+        directories = directories.filter(updated_at__gt=since)
+        versions = versions.filter(updated_at__gt=since)
+        tombstones = tombstones.filter(deleted_at__gt=since)
+
+    touched = list(directories.union(versions, tombstones, all=True))
+    if not touched:
+        return Changes([], [], since)
+
+    query = Directory.objects.order_by("id")
+    if since is not None:
+        query = query.filter(id__in={directory_id for directory_id, _ in touched})
+
+    refbooks = {
+        row["id"]: {**row, "versions": []}
+        for row in query.values("id", "code", "name", "description", "updated_at")
+    }
+    versions = VersionDirectory.objects.filter(directory_id__in=refbooks) \
+        .order_by("directory_id", "created_date") \
+        .values("id", "directory_id", "version", "created_date", "valid_to", "updated_at")
+
+    for row in versions:
+        refbooks[row.pop("directory_id")]["versions"].append(row)
+
+    deleted = {directory_id for directory_id, _ in tombstones}
+    if deleted:
+        # Идентификатор удалённого справочника SQLite может выдать новому справочнику
+        deleted -= set(Directory.objects.filter(id__in=deleted).values_list("id", flat=True))
+
+    latest = max(updated_at for _, updated_at in touched)
+    cursor = min(latest, timezone.now() - timedelta(seconds=settings.CHANGES_SAFETY_WINDOW))
+
+    return Changes(list(refbooks.values()), sorted(deleted), max(cursor, since) if since else cursor)
+
+
+membership_index = create_membership_index(
+    version_pairs,
+    backend=settings.MEMBERSHIP_INDEX_BACKEND,
+    redis_url=settings.MEMBERSHIP_INDEX_REDIS_URL,
+    max_versions=settings.MEMBERSHIP_INDEX_SIZE,
+    ttl=settings.MEMBERSHIP_INDEX_TTL,
+)
+
+
+def element_exists(resolved: ResolvedVersion | None, code: str, value: str) -> bool:
+    """ Проверяет наличие элемента в версии справочника по индексу """
+    if resolved is None:
+        return False
+    return membership_index.contains(resolved, code, value)
+
+
+async def aelement_exists(resolved: ResolvedVersion | None, code: str, value: str) -> bool:
+    """
+    Асинхронная проверка наличия элемента. Построенный индекс отвечает из памяти,
+    локальный индекс строится один раз в потоке, иначе - запрос aexists() к БД
+    """
+    if resolved is None:
+        return False
+    if membership_index.is_loaded(resolved):
+        return membership_index.contains(resolved, code, value)
+    if isinstance(membership_index, LocalMembershipIndex):
+        return await sync_to_async(membership_index.contains)(resolved, code, value)
+
+    elements = await aversion_elements(resolved.id)
+    return await elements.filter(code=code, value=value).aexists()
+
+
+def elements_exist(
+    resolved: ResolvedVersion | None, pairs: list[tuple[str, str]],
+) -> list[bool]:
+    """ Проверяет наличие набора элементов в версии справочника по индексу """
+    if resolved is None:
+        return [False] * len(pairs)
+    return membership_index.contains_many(resolved, pairs)
+
+
+def clear_caches() -> None:
+    """ Очищает все кэши сервиса """
+    version_cache.clear()
+    membership_index.clear()
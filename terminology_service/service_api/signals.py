@@ -0,0 +1,145 @@
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import api_key_cache
+from .models import (
+    ApiKey,
+    Directory,
+    DirectoryTombstone,
+    VersionDirectory,
+    DirectoryElement,
+    VersionElement,
+)
+from .services import version_cache, membership_index, touch_directories, touch_versions
+from .snapshots import remove_snapshots
+
+
+def invalidate_membership_on_commit(version_id: int) -> None:
+    """
+    Сбрасывает индекс принадлежности версии после фиксации транзакции: индекс,
+    построенный до фиксации, содержал бы прежние элементы версии
+    """
+    transaction.on_commit(partial(membership_index.invalidate, version_id))
+
+
+# Версии с изменёнными элементами, ожидающие фиксации транзакции в этом потоке
+_changed_versions = threading.local()
+
+
+def _flush_changed_versions() -> None:
+    version_ids = _changed_versions.__dict__.pop("ids", set())
+    if not version_ids:
+        return
+
+    touch_versions(version_ids)
+
+    for version_id in version_ids:
+        membership_index.invalidate(version_id)
+        remove_snapshots(version_id)
+
+
+def version_changed_on_commit(version_id: int, using: str) -> None:
+    """
+    Откладывает обработку изменения элементов версии до фиксации транзакции:
+    отметка изменения, сброс кэшей и удаление снимков выполняются один раз
+    на версию, сколько бы её элементов ни было сохранено в транзакции
+    """
+    _changed_versions.__dict__.setdefault("ids", set()).add(version_id)
+    connection = transaction.get_connection(using)
+    savepoints = set(connection.savepoint_ids)
+
+    # Обработчик регистрируется один раз на уровень вложенности транзакции:
+    # отброшенный откатом точки сохранения регистрируется заново
+    if not any(
+        callback is _flush_changed_versions and registered_in == savepoints
+        for registered_in, callback, _ in connection.run_on_commit
+    ):
+        transaction.on_commit(_flush_changed_versions, using=using)
+
+
+@receiver(pre_save, sender=VersionDirectory)
+def remember_previous_directory(sender, instance: VersionDirectory, **kwargs) -> None:
+    """ Запоминает прежний справочник версии, если версия переносится в другой """
+    instance._previous_directory_id = None
+
+    if instance.pk:
+        instance._previous_directory_id = VersionDirectory.objects \
+            .filter(pk=instance.pk) \
+            .values_list("directory_id", flat=True) \
+            .first()
+
+
+@receiver([post_save, post_delete], sender=VersionDirectory)
+def invalidate_version_cache(sender, instance: VersionDirectory, **kwargs) -> None:
+    """
+    Пересчитывает периоды действия версий справочника, отмечает изменение
+    справочников и сбрасывает кэш версий при любом изменении версий справочников
+    """
+    directories = {instance.directory_id, getattr(instance, "_previous_directory_id", None)}
+
+    for directory_id in directories - {None}:
+        VersionDirectory.refresh_intervals(directory_id)
+
+    touch_directories(directories - {None})
+
+    version_cache.clear()
+    invalidate_membership_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=VersionDirectory)
+def delete_snapshots(sender, instance: VersionDirectory, **kwargs) -> None:
+    """ Удаляет снимки удалённой версии справочника """
+    remove_snapshots(instance.pk)
+
+
+@receiver(post_delete, sender=Directory)
+def record_directory_deletion(sender, instance: Directory, **kwargs) -> None:
+    """ Запоминает удалённый справочник, чтобы лента изменений сообщила о нём """
+    DirectoryTombstone.objects.create(directory_id=instance.pk, code=instance.code)
+
+
+@receiver(pre_save, sender=DirectoryElement)
+def invalidate_previous_membership(sender, instance: DirectoryElement, using: str, **kwargs) -> None:
+    """ Отмечает изменение прежней версии, если элемент перенесён в другую версию """
+    if instance.pk:
+        previous = DirectoryElement.objects.using(using).filter(pk=instance.pk) \
+            .values_list("version_directory_id", flat=True).first()
+
+        if previous and previous != instance.version_directory_id:
+            version_changed_on_commit(previous, using)
+
+
+@receiver([post_save, post_delete], sender=DirectoryElement)
+@receiver([post_save, post_delete], sender=VersionElement)
+def invalidate_membership(
+    sender, instance: DirectoryElement | VersionElement, using: str, **kwargs,
+) -> None:
+    """
+    Сбрасывает индекс принадлежности версии при изменении её элементов
+    и обновляет дату изменения версии
+    """
+    version_changed_on_commit(instance.version_directory_id, using)
+
+
+@receiver([post_save, post_delete], sender=ApiKey)
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_api_keys(sender, **kwargs) -> None:
+    """ Сбрасывает кэш проверенных ключей API при изменении ключей и пользователей """
+    api_key_cache.clear()
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs) -> None:
+    """ Применяет settings.SQLITE_PRAGMAS к каждому новому соединению SQLite """
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,154 @@
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class _Call:
+    """ Выполняющееся вычисление и его результат для ожидающих потоков """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вычислений в процессе: первый поток
+    (ведущий) выполняет вычисление, остальные с тем же ключом ждут его
+    и получают тот же результат или то же исключение. Результат не кэшируется
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def in_flight(self) -> int:
+        """ Число выполняющихся вычислений """
+        with self._lock:
+            return len(self._calls)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Эксклюзивная блокировка файла (flock), общая для процессов одного узла.
+    Без fcntl (Windows) блокировка не выполняется
+    """
+    if fcntl is None:
+        yield
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "a") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class LockedSingleFlight(SingleFlight):
+    """
+    SingleFlight, дополнительно объединяющий вычисления рабочих процессов узла.
+    Сначала результат ищется через ready() в общем хранилище (например, на диске)
+    без блокировки. Иначе ведущий поток процесса берёт файловую блокировку,
+    повторно проверяет ready() (результат мог сохранить процесс, державший
+    блокировку до него) и выполняет вычисление. Сохранение результата (publish)
+    выполняется в фоновом потоке, который освобождает блокировку после него:
+    ответ ведущему не ждёт сохранения, а ожидающие процессы получат результат
+    через ready()
+    """
+
+    def __init__(self, lock_dir: Path | Callable[[], Path]):
+        super().__init__()
+        self.lock_dir = lock_dir
+        self._publishing: set[threading.Thread] = set()
+
+    def do(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        lock: str | None = None,
+        ready: Callable[[], Any] | None = None,
+        publish: Callable[[Any], None] | None = None,
+    ) -> Any:
+        if lock is None:
+            return super().do(key, compute)
+
+        lock_dir = self.lock_dir() if callable(self.lock_dir) else self.lock_dir
+
+        def locked():
+            result = ready() if ready is not None else None
+            if result is not None:
+                return result
+
+            with ExitStack() as stack:
+                stack.enter_context(file_lock(Path(lock_dir) / f".{lock}.lock"))
+
+                result = ready() if ready is not None else None
+                if result is not None:
+                    return result
+
+                result = compute()
+                if publish is not None:
+                    self._publish(stack.pop_all(), publish, result)
+
+            return result
+
+        return super().do(key, locked)
+
+    def _publish(self, lock: ExitStack, publish: Callable[[Any], None], result: Any) -> None:
+        def run():
+            try:
+                with lock:
+                    publish(result)
+            finally:
+                with self._lock:
+                    self._publishing.discard(thread)
+
+        thread = threading.Thread(target=run, daemon=True)
+        with self._lock:
+            self._publishing.add(thread)
+        thread.start()
+
+    def join(self, timeout: float | None = None) -> None:
+        """ Ожидает завершения фоновых сохранений результатов """
+        with self._lock:
+            threads = list(self._publishing)
+
+        for thread in threads:
+            thread.join(timeout)
@@ -0,0 +1,194 @@
+import gzip
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.db import connection
+
+from .cache import LocalCache
+from .models import VersionDirectory
+from .renderers import stream_json, stream_ndjson
+from .services import version_elements
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Форматы снимков: расширение файла -> функция формирования содержимого
+FORMATS: dict[str, Callable[[Iterator[tuple[str, str]]], Iterator[bytes]]] = {
+    "json": stream_json,
+    "ndjson": stream_ndjson,
+}
+
+
+# Кодировки сжатия -> расширение файла
+EXTENSIONS = {"br": "br", "gzip": "gz"}
+
+# Распакованное содержимое снимков gzip для клиентов, не принимающих сжатие
+snapshot_contents = LocalCache(max_size=settings.SNAPSHOT_CONTENT_CACHE_SIZE)
+
+# Фоновые построения снимков выполняются по одному: более раннее построение
+# не удалит снимки более позднего состояния версии
+_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshots")
+
+
+def available_encodings() -> tuple[str, ...]:
+    """ Кодировки сжатия снимков в порядке предпочтения """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _stamp(updated_at: datetime) -> str:
+    return str(int(updated_at.timestamp() * 1_000_000))
+
+
+def snapshot_path(version_id: int, stamp: str, file_format: str, encoding: str) -> Path:
+    """ Путь к снимку; метка изменения версии делает устаревшие снимки недостижимыми """
+    name = f"{version_id}-{stamp}.{file_format}.{EXTENSIONS[encoding]}"
+    return Path(settings.SNAPSHOT_DIR) / name
+
+
+def find_snapshot(
+    version_id: int, updated_at: datetime, file_format: str, accept_encoding: str,
+) -> tuple[Path, str] | None:
+    """ Возвращает путь к снимку и его кодировку, подходящие клиенту, либо None """
+    if not settings.SNAPSHOTS_ENABLED or file_format not in FORMATS:
+        return None
+
+    accepted = parse_accept_encoding(accept_encoding)
+    stamp = _stamp(updated_at)
+
+    for encoding in available_encodings():
+        if encoding in accepted:
+            path = snapshot_path(version_id, stamp, file_format, encoding)
+            if path.is_file():
+                return path, encoding
+
+    return None
+
+
+def parse_accept_encoding(header: str) -> set[str]:
+    """ Кодировки, которые клиент принимает (с ненулевым q) """
+    accepted = set()
+
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=") or "1"
+
+        try:
+            if name and float(quality) > 0:
+                accepted.add(name.strip().lower())
+        except ValueError:
+            continue
+
+    return accepted
+
+
+def _compressor(encoding: str, file) -> tuple[Callable[[bytes], None], Callable[[], None]]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.SNAPSHOT_BROTLI_QUALITY)
+        return (
+            lambda data: file.write(compressor.process(data)),
+            lambda: file.write(compressor.finish()),
+        )
+
+    # Без имени и времени в заголовке снимки одного состояния версии совпадают побайтно
+    stream = gzip.GzipFile(filename="", fileobj=file, mode="wb", compresslevel=9, mtime=0)
+    return stream.write, stream.close
+
+
+def build_snapshot(version_id: int) -> list[Path]:
+    """
+    Записывает предварительно сжатые снимки элементов версии справочника
+    во всех форматах и кодировках, удаляя снимки прежнего состояния версии
+    """
+    version = VersionDirectory.objects.filter(pk=version_id).first()
+    if version is None or not settings.SNAPSHOTS_ENABLED:
+        return []
+
+    directory = Path(settings.SNAPSHOT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = _stamp(version.updated_at)
+    paths = []
+
+    for file_format, render in FORMATS.items():
+        for encoding in available_encodings():
+            rows = version_elements(version_id).values_list("code", "value") \
+                .iterator(chunk_size=settings.ELEMENTS_STREAM_CHUNK_SIZE)
+            path = snapshot_path(version_id, stamp, file_format, encoding)
+            _write(path, render(rows), encoding)
+            paths.append(path)
+
+    remove_snapshots(version_id, keep=paths)
+    return paths
+
+
+def build_snapshot_later(version_id: int) -> Future:
+    """ Строит снимки версии в фоновом потоке, не задерживая запрос """
+    return _builder.submit(_build_and_close, version_id)
+
+
+def _build_and_close(version_id: int) -> list[Path]:
+    try:
+        return build_snapshot(version_id)
+    finally:
+        # Соединение фонового потока не закрывается обработчиком запросов
+        connection.close()
+
+
+def _write(path: Path, chunks: Iterable[bytes], encoding: str) -> None:
+    # Запись во временный файл и атомарная замена: читатели не увидят частичный снимок
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+        write, finish = _compressor(encoding, file)
+        for chunk in chunks:
+            write(chunk)
+        finish()
+
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+
+
+def publish_snapshot(version_id: int, updated_at: datetime, file_format: str, content: bytes) -> None:
+    """
+    Сохраняет уже сформированное содержимое версии как снимок в gzip,
+    чтобы другие рабочие процессы и клиенты не формировали его заново
+    """
+    if not settings.SNAPSHOTS_ENABLED:
+        return
+
+    path = snapshot_path(version_id, _stamp(updated_at), file_format, "gzip")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write(path, [content], "gzip")
+
+
+def read_snapshot(version_id: int, updated_at: datetime, file_format: str) -> bytes | None:
+    """
+    Несжатое содержимое снимка версии в gzip, либо None, если снимка нет.
+    Снимок распаковывается один раз на состояние версии
+    """
+    path = snapshot_path(version_id, _stamp(updated_at), file_format, "gzip")
+    content = snapshot_contents.get(path)
+
+    if content is None:
+        try:
+            content = gzip.decompress(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        snapshot_contents.set(path, content)
+
+    return content
+
+
+def remove_snapshots(version_id: int, keep: list[Path] = ()) -> None:
+    """ Удаляет снимки версии справочника, кроме перечисленных """
+    directory = Path(settings.SNAPSHOT_DIR)
+    if not directory.is_dir():
+        return
+
+    for path in directory.glob(f"{version_id}-*"):
+        if path not in keep:
+            path.unlink(missing_ok=True)
@@ -1,11 +1,34 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import DirectoryView, DirectoryElementView, DirectoryCheckView
+from .async_views import AsyncDirectoryElementView, AsyncDirectoryCheckView
+from .views import (
+    DirectoryView,
+    DirectoryChangesView,
+    DirectoryElementView,
+    DirectoryCheckView,
+    DirectoryBulkCheckView,
+    DirectoryDiffView,
+    ElementLookupView,
+    metrics_view,
+)
 
 app_name = 'service_api'
 
+if settings.ASYNC_VIEWS:
+    element_view = AsyncDirectoryElementView.as_view()
+    check_view = AsyncDirectoryCheckView.as_view()
+else:
+    element_view = DirectoryElementView.as_view()
+    check_view = DirectoryCheckView.as_view()
+
 urlpatterns = [
     path('refbooks/', DirectoryView.as_view(), name="directory-list"),
-    path('refbooks/<int:id>/elements', DirectoryElementView.as_view(), name="element"),
-    path('refbooks/<int:id>/check_element', DirectoryCheckView.as_view(), name="check"),
+    path('refbooks/changes', DirectoryChangesView.as_view(), name="changes"),
+    path('refbooks/<int:id>/elements', element_view, name="element"),
+    path('refbooks/<int:id>/check_element', check_view, name="check"),
+    path('refbooks/<int:id>/check_elements', DirectoryBulkCheckView.as_view(), name="check-bulk"),
+    path('refbooks/<int:id>/diff', DirectoryDiffView.as_view(), name="diff"),
+    path('elements/lookup', ElementLookupView.as_view(), name="lookup"),
+    path('metrics', metrics_view, name="metrics"),
 ]
@@ -1,24 +1,62 @@
-from datetime import date
-from sqlite3 import Date
+from pathlib import Path
+from typing import Iterator
 
-from django.db.models import Prefetch, Max, Subquery
-from django.http import HttpResponseNotFound
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    HttpResponseNotFound,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_vary_headers
 from rest_framework.generics import GenericAPIView
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from .models import Directory, DirectoryElement, VersionDirectory
+from .models import Directory, VersionDirectory
 from .serializers import (
-    DirectorySerializer,
-    DirectoryElementSerializer,
     DateSerializer,
     CheckSerializer,
+    BulkCheckSerializer,
+    DiffSerializer,
+    LookupSerializer,
+    ChangesSerializer,
+    CursorField,
 )
 from .documentations import (
     directory_docs,
     directory_element_docs,
     directory_check_docs,
+    directory_bulk_check_docs,
+    directory_diff_docs,
+    element_lookup_docs,
+    directory_changes_docs,
+)
+from .conditional import representation_etag, not_modified_response, set_validators
+from .metrics import metrics
+from .pagination import DirectoryPagination, DirectoryElementPagination, SearchPagination
+from .renderers import NDJSONRenderer, stream_json, stream_ndjson
+from .routers import keep_replica_reads, replica_reads
+from .services import (
+    ResolvedVersion,
+    directories_state,
+    resolve_version,
+    version_elements,
+    element_exists,
+    elements_exist,
+    version_diff,
+    lookup_code,
+    changes_since,
 )
+from .search import search_elements
+from .singleflight import LockedSingleFlight
+from .snapshots import find_snapshot, publish_snapshot, read_snapshot
+
+# Формирование полного списка элементов версии: одно на версию среди одновременных запросов
+element_flight = LockedSingleFlight(lambda: settings.SNAPSHOT_DIR)
 
 
 def page_not_fount(request, exception):
@@ -26,69 +64,184 @@ def page_not_fount(request, exception):
     return HttpResponseNotFound("<h1>Page not found</h1>")
 
 
-class DirectoryView(GenericAPIView):
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """ Метрики запросов процесса в текстовом формате Prometheus """
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4")
+
+
+class ReplicaReadAPIView(GenericAPIView):
+    """ Представление API, данные которого читаются с реплик (см. ReplicaRouter) """
+
+    def dispatch(self, request, *args, **kwargs) -> HttpResponseBase:
+        with replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+        return keep_replica_reads(response)
+
+
+class DirectoryView(ReplicaReadAPIView):
     """ Endpoint for getting a list of reference books for a given date """
+    pagination_class = DirectoryPagination
+
     @directory_docs
     def get(self, request: Request, *args, **kwargs) -> Response:
         try:
-            query = Directory.objects.prefetch_related("versions") \
-                .values("id", "code", "name") \
-                .distinct()
+            state, last_modified = directories_state()
+            etag = representation_etag(request, *state)
+
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            query = Directory.objects.values("id", "code", "name")
 
             if request.query_params.dict().get("date"):
-                serializer = DateSerializer(request.query_params.dict())
+                serializer = DateSerializer(data=request.query_params.dict())
+
+                if not serializer.is_valid():
+                    return Response({"error": str(serializer.errors)}, 404)
 
-                if serializer.is_valid():
-                    query = query.filter(
-                        versions__created_date__lte=serializer.validated_data.get("date")
-                    )
+                active = VersionDirectory.active_on(serializer.validated_data.get("date"))
+                query = query.filter(
+                    id__in=VersionDirectory.objects.filter(active).values("directory_id")
+                )
 
-            return Response({"refbooks": DirectorySerializer(query, many=True).data})
+            if self.paginator.is_requested(request):
+                page = self.paginate_queryset(query)
+                response = self.get_paginated_response(page)
+            else:
+                response = Response({"refbooks": list(query)})
+
+            return set_validators(response, etag, last_modified)
         except Exception as e:
             return Response({"error": str(e)}, 404)
 
 
-class DirectoryElementView(GenericAPIView):
+class DirectoryElementView(ReplicaReadAPIView):
     """ Endpoint for getting a specific directory item """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    pagination_class = DirectoryElementPagination
+
     @directory_element_docs
     def get(self, request: Request, *args, **kwargs) -> Response:
         try:
             directory_id = int(kwargs.get("id"))
             version = request.query_params.dict().get("version")
 
-            preloaded = Prefetch(
-                "version_directory",
-                queryset=VersionDirectory.objects.select_related("directory")
+            resolved = resolve_version(directory_id, version)
+            snapshot = self.chosen_snapshot(request, resolved)
+            etag = representation_etag(
+                request, directory_id, resolved, content_coding=snapshot and snapshot[1],
             )
-            query = DirectoryElement.objects.prefetch_related(preloaded) \
-                .values("code", "value") \
-                .distinct() \
-                .filter(version_directory__directory__id=directory_id)
+            last_modified = resolved.updated_at if resolved else None
 
-            if version:
-                result = query.filter(version_directory__version=version)
-            else:
-                today = date.today()
-
-                max_date_subquery = Subquery(
-                    VersionDirectory.objects
-                    .filter(directory_id=directory_id, created_date__lte=today)
-                    .values('created_date')
-                    .annotate(max_date=Max('created_date'))
-                    .values('max_date')[:1]
-                )
-                result = query.filter(
-                    version_directory__created_date=max_date_subquery
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is None:
+                response = set_validators(
+                    self.elements_response(request, resolved, snapshot), etag, last_modified,
                 )
-
-            return Response({
-                "elements": DirectoryElementSerializer(result.all(), many=True).data
-            })
+            else:
+                response = not_modified
         except Exception as e:
-            return Response({"error": str(e)}, 404)
+            response = Response({"error": str(e)}, 404)
+
+        # Ответ может быть сжатым снимком, поэтому зависит от Accept-Encoding
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    def chosen_snapshot(
+        self, request: Request, resolved: ResolvedVersion | None,
+    ) -> tuple[Path, str] | None:
+        """ Снимок, подходящий клиенту, если ответ содержит все элементы версии """
+        if resolved is None or "q" in request.query_params or self.paginator.is_requested(request):
+            return None
 
+        return find_snapshot(
+            resolved.id,
+            resolved.updated_at,
+            request.accepted_renderer.format,
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+        )
 
-class DirectoryCheckView(GenericAPIView):
+    def elements_response(
+        self,
+        request: Request,
+        resolved: ResolvedVersion | None,
+        snapshot: tuple[Path, str] | None = None,
+    ) -> HttpResponseBase:
+        version_id = resolved.id if resolved else None
+
+        query = request.query_params.get("q")
+        if query is not None:
+            paginator = SearchPagination()
+            page = paginator.paginate_search(
+                lambda limit, offset: search_elements(version_id, query, limit, offset),
+                request,
+            )
+            return paginator.get_paginated_response(page)
+
+        if self.paginator.is_requested(request):
+            page = self.paginate_queryset(
+                version_elements(version_id).values("code", "value")
+            )
+            return self.get_paginated_response(page)
+
+        if snapshot:
+            return self.snapshot_response(request, *snapshot)
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return StreamingHttpResponse(
+                stream_ndjson(self.stream_rows(version_id)),
+                content_type=NDJSONRenderer.media_type,
+            )
+        if request.query_params.get("stream") in ("1", "true"):
+            return StreamingHttpResponse(
+                stream_json(self.stream_rows(version_id)),
+                content_type="application/json",
+            )
+
+        media_type = request.accepted_media_type or ""
+        if resolved and request.accepted_renderer.format == "json" and "indent" not in media_type:
+            return HttpResponse(
+                self.elements_content(resolved), content_type=request.accepted_renderer.media_type,
+            )
+
+        result = version_elements(version_id).values("code", "value")
+
+        return Response({"elements": list(result)})
+
+    @classmethod
+    def elements_content(cls, resolved: ResolvedVersion) -> bytes:
+        """
+        Тело JSON-ответа со всеми элементами версии. Одновременные запросы одной
+        версии формируют его один раз: потоки процесса ждут ведущего, а рабочие
+        процессы узла - под файловой блокировкой, получая опубликованный им снимок
+        """
+        return element_flight.do(
+            (resolved.id, resolved.updated_at),
+            lambda: b"".join(stream_json(cls.stream_rows(resolved.id))),
+            lock=f"elements-{resolved.id}" if settings.SNAPSHOTS_ENABLED else None,
+            ready=lambda: read_snapshot(resolved.id, resolved.updated_at, "json"),
+            publish=lambda content: publish_snapshot(
+                resolved.id, resolved.updated_at, "json", content,
+            ),
+        )
+
+    @staticmethod
+    def snapshot_response(request: Request, path: Path, encoding: str) -> FileResponse:
+        response = FileResponse(
+            path.open("rb"), content_type=request.accepted_renderer.media_type,
+        )
+        response.headers["Content-Encoding"] = encoding
+        response.headers.pop("Content-Disposition", None)
+        return response
+
+    @staticmethod
+    def stream_rows(version_id: int | None) -> Iterator[tuple[str, str]]:
+        return version_elements(version_id).values_list("code", "value") \
+            .iterator(chunk_size=settings.ELEMENTS_STREAM_CHUNK_SIZE)
+
+
+class DirectoryCheckView(ReplicaReadAPIView):
     """ Endpoint for checking if a directory element exists in the database """
     @directory_check_docs
     def get(self, request: Request, *args, **kwargs) -> Response:
@@ -97,36 +250,129 @@ class DirectoryCheckView(GenericAPIView):
 
             serializer = CheckSerializer(data=request.query_params.dict())
 
-            if serializer.is_valid():
-                preloaded = Prefetch(
-                    "version_directory",
-                    queryset=VersionDirectory.objects.select_related("directory")
-                )
-                query = DirectoryElement.objects.prefetch_related(preloaded).distinct() \
-                    .filter(
-                    version_directory__directory__id=directory_id,
-                    code=serializer.validated_data.get("code"),
-                    value=serializer.validated_data.get("value"),
-                )
+            if not serializer.is_valid():
+                return Response({"error": str(serializer.errors)}, 404)
+
+            resolved = resolve_version(
+                directory_id, serializer.validated_data.get("version")
+            )
+            etag = representation_etag(request, directory_id, resolved)
+            last_modified = resolved.updated_at if resolved else None
+
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            exists = element_exists(
+                resolved,
+                serializer.validated_data.get("code"),
+                serializer.validated_data.get("value"),
+            )
 
-                if serializer.validated_data.get("version"):
-                    result = query.filter(
-                        version_directory__version=serializer.validated_data.get("version")
-                    )
-                else:
-                    today = date.today()
-
-                    max_date_subquery = Subquery(
-                        VersionDirectory.objects
-                        .filter(directory_id=directory_id, created_date__lte=today)
-                        .values('created_date')
-                        .annotate(max_date=Max('created_date'))
-                        .values('max_date')[:1]
-                    )
-                    result = query.filter(
-                        version_directory__created_date=max_date_subquery
-                    )
-
-                return Response({"exists": bool(result.exists())})
+            return set_validators(Response({"exists": exists}), etag, last_modified)
+        except Exception as e:
+            return Response({"error": str(e)}, 404)
+
+
+class DirectoryBulkCheckView(ReplicaReadAPIView):
+    """ Endpoint for checking a batch of directory elements in one request """
+    @directory_bulk_check_docs
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        try:
+            directory_id = int(kwargs.get("id"))
+
+            serializer = BulkCheckSerializer(data=request.data)
+
+            if not serializer.is_valid():
+                return Response({"error": str(serializer.errors)}, 404)
+
+            resolved = resolve_version(
+                directory_id, serializer.validated_data.get("version")
+            )
+            exists = elements_exist(
+                resolved, serializer.validated_data.get("elements")
+            )
+
+            return Response({"exists": exists})
+        except Exception as e:
+            return Response({"error": str(e)}, 404)
+
+
+class DirectoryDiffView(ReplicaReadAPIView):
+    """ Endpoint for getting the difference between two directory versions """
+    @directory_diff_docs
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        try:
+            directory_id = int(kwargs.get("id"))
+
+            serializer = DiffSerializer(data=request.query_params.dict())
+
+            if not serializer.is_valid():
+                return Response({"error": str(serializer.errors)}, 404)
+
+            versions = [
+                serializer.validated_data.get(name) for name in ("from", "to")
+            ]
+            resolved = [resolve_version(directory_id, version) for version in versions]
+
+            for version, item in zip(versions, resolved):
+                if item is None:
+                    raise ValueError(f"Version {version} of directory {directory_id} not found")
+
+            etag = representation_etag(request, directory_id, *resolved)
+            last_modified = max(item.updated_at for item in resolved)
+
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            diff = version_diff(resolved[0].id, resolved[1].id)
+
+            return set_validators(
+                Response({"from": versions[0], "to": versions[1], **diff._asdict()}),
+                etag,
+                last_modified,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, 404)
+
+
+class ElementLookupView(ReplicaReadAPIView):
+    """ Endpoint for finding the directories that contain an element code """
+    @element_lookup_docs
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        try:
+            serializer = LookupSerializer(data=request.query_params.dict())
+
+            if not serializer.is_valid():
+                return Response({"error": str(serializer.errors)}, 404)
+
+            refbooks = lookup_code(
+                serializer.validated_data.get("code"),
+                serializer.validated_data.get("date"),
+            )
+
+            return Response({"refbooks": refbooks})
+        except Exception as e:
+            return Response({"error": str(e)}, 404)
+
+
+class DirectoryChangesView(ReplicaReadAPIView):
+    """ Endpoint for getting the reference books changed after a cursor """
+    @directory_changes_docs
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        try:
+            serializer = ChangesSerializer(data=request.query_params.dict())
+
+            if not serializer.is_valid():
+                return Response({"error": str(serializer.errors)}, 404)
+
+            changes = changes_since(serializer.validated_data.get("since"))
+
+            return Response({
+                "cursor": CursorField().to_representation(changes.cursor),
+                "refbooks": changes.refbooks,
+                "deleted": changes.deleted,
+            })
         except Exception as e:
             return Response({"error": str(e)}, 404)
@@ -0,0 +1,33 @@
+"""
+API-only settings profile: DJANGO_SETTINGS_MODULE=terminology_service.settings_api
+
+Serves only the service_api routes (terminology_service/urls_api.py) without the admin,
+sessions, messages, static files and schema apps and without stateful middleware.
+Migrations and the admin are run with the full profile (terminology_service.settings).
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'rest_framework',
+    'service_api.apps.ServiceApiConfig',
+]
+
+MIDDLEWARE = [
+    'service_api.middleware.QueryMetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'terminology_service.urls_api'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    "DEFAULT_RENDERER_CLASSES": ["service_api.renderers.FastJSONRenderer"],
+    "DEFAULT_AUTHENTICATION_CLASSES": ["service_api.authentication.ApiKeyAuthentication"],
+    "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.openapi.AutoSchema",
+    "UNAUTHENTICATED_USER": None,
+}
@@ -16,15 +16,16 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 
+from service_api.schema import StaticSchemaView
 from service_api.views import page_not_fount
 
 handler404 = page_not_fount
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name="schema"),
+    path('api/schema/', StaticSchemaView.as_view(), name="schema"),
     path('api/schema/swagger/', SpectacularSwaggerView.as_view(url_name="schema"), name="swagger"),
     path('', include('service_api.urls')),
 ]
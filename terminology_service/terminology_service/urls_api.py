@@ -0,0 +1,13 @@
+"""
+URL configuration of the API-only settings profile (terminology_service.settings_api):
+only the service_api routes, without the admin and the schema views.
+"""
+from django.urls import path, include
+
+from service_api.views import page_not_fount
+
+handler404 = page_not_fount
+
+urlpatterns = [
+    path('', include('service_api.urls')),
+]